@@ -1,178 +1,362 @@
-import csv
-import random
+import threading
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException
-from datetime import datetime
+from selenium.webdriver.support.ui import Select, WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException, TimeoutException
+from concurrent.futures import ThreadPoolExecutor
+from lxml import html as lxml_html
 import os
-import shutil
-import psutil
-import tempfile
 import logging
-import subprocess
+from scraper_base import Source, run_cli
+from delta_index import DeltaIndex, INCREMENTAL, deadline_reader, fields_fingerprint
+from source_schemas import SOURCE_SCHEMAS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Output directory
-DOWNLOAD_DIR = "auction_exports"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-
-def setup_chrome_options(user_data_dir):
-    """Set up Chrome options for headless browsing."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Enable headless mode
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36")
-    chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-    chrome_options.add_experimental_option('prefs', {
-        "download.default_directory": os.path.abspath(DOWNLOAD_DIR),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True,
-        "safebrowsing.enabled": True
-    })
-    return chrome_options
-
-def cleanup_chrome_processes():
-    """Kill any lingering Chrome processes."""
-    chrome_processes = []
-    for proc in psutil.process_iter(['name', 'pid']):
-        if proc.info['name'] in ['chrome', 'chromium', 'chromedriver']:
-            chrome_processes.append((proc.info['pid'], proc.info['name']))
-            try:
-                proc.kill()
-                logger.info(f"Killed lingering process: {proc.info['name']} (PID: {proc.info['pid']})")
-            except psutil.NoSuchProcess:
-                logger.info(f"Process {proc.info['name']} (PID: {proc.info['pid']}) already terminated.")
-    return chrome_processes
-
-# Clean up any lingering Chrome processes before starting
-logger.info("Cleaning up Chrome processes before starting...")
-existing_processes = cleanup_chrome_processes()
-if existing_processes:
-    logger.info(f"Found and killed {len(existing_processes)} Chrome-related processes: {existing_processes}")
-else:
-    logger.info("No Chrome-related processes found running.")
-
-# Verify ChromeDriver version
-try:
-    chromedriver_version = subprocess.check_output(["chromedriver", "--version"]).decode().strip()
-    logger.info(f"ChromeDriver version: {chromedriver_version}")
-except Exception as e:
-    logger.error(f"Failed to check ChromeDriver version: {e}")
-
-# Create a temporary user data directory
-user_data_dir = tempfile.mkdtemp(prefix="chrome_user_data_albion_")
-logger.info(f"Created temporary user data directory: {user_data_dir}")
-
-# Verify the directory is empty
-if os.path.exists(user_data_dir):
-    dir_contents = os.listdir(user_data_dir)
-    if dir_contents:
-        logger.warning(f"User data directory {user_data_dir} is not empty: {dir_contents}")
-    else:
-        logger.info(f"User data directory {user_data_dir} is empty as expected.")
-else:
-    logger.error(f"User data directory {user_data_dir} was not created!")
-    exit(1)
-
-# Initialize the WebDriver
-chrome_options = setup_chrome_options(user_data_dir)
-driver = None
-try:
-    logger.info("Starting Chrome WebDriver...")
-    driver = webdriver.Chrome(options=chrome_options)
-    logger.info("Chrome WebDriver started successfully.")
-    
-    driver.get("https://albionbankauctions.com/")
-    driver.maximize_window()
-    time.sleep(random.uniform(4, 7))  # Wait for JS to load content
+# Overridable so the scraper can be pointed at a local fixture site
+START_URL = os.getenv("ALBION_URL", "https://albionbankauctions.com/")
+# "snapshot" parses each page from one page_source grab; "webdriver" uses per-card find_element calls
+PARSE_MODE = os.getenv("ALBION_PARSE_MODE", "snapshot")
+# Number of parallel browser sessions splitting the listing's page range
+SHARDS = int(os.getenv("ALBION_SHARDS", "1"))
+# Fields whose change makes a known auction worth re-scraping in incremental mode
+KEY_FIELDS = ["Auction ID", "Bank Name", "Reserve Price", "Auction Date"]
+# Seconds to wait for the listing to render or change after navigating
+PAGE_TIMEOUT = 30
+
+def has_class(name):
+    """XPath predicate matching elements carrying the given CSS class."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Elements whose content WebElement.text never includes, and those it puts on lines of their own
+HIDDEN_TAGS = {"script", "style", "noscript", "template", "head", "title"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset", "figcaption", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p",
+    "pre", "section", "table", "tr", "ul",
+}
+
+def is_hidden(element):
+    """True for elements hidden by the hidden attribute or an inline display:none / visibility:hidden."""
+    style = (element.get("style") or "").replace(" ", "").lower()
+    return element.get("hidden") is not None or "display:none" in style or "visibility:hidden" in style
+
+# Stands for a rendered line break, so newlines in the HTML source stay plain whitespace
+LINE_BREAK = "\x1e"
+
+def append_visible(element, parts):
+    """Append the rendered text of an element and its tail to parts."""
+    if isinstance(element.tag, str) and element.tag not in HIDDEN_TAGS and not is_hidden(element):
+        block = element.tag in BLOCK_TAGS
+        parts.append(LINE_BREAK if block or element.tag == "br" else "")
+        parts.append(element.text or "")
+        for child in element:
+            append_visible(child, parts)
+        parts.append(LINE_BREAK if block else "")
+    parts.append(element.tail or "")
+
+def visible_text(element):
+    """Text of an element as WebElement.text renders it.
+
+    Script, style and inline-hidden content is left out, line breaks are kept at <br> and
+    block elements, and whitespace is collapsed within each line. Elements hidden only by
+    stylesheet rules cannot be told apart in a snapshot.
+    """
+    if is_hidden(element):
+        return ""
+    parts = [element.text or ""]
+    for child in element:
+        append_visible(child, parts)
+    lines = (" ".join(line.split()) for line in "".join(parts).split(LINE_BREAK))
+    return "\n".join(line for line in lines if line)
+
+def element_text(card, xpath):
+    """Return the visible text of the first match, like WebElement.text."""
+    matches = card.xpath(xpath)
+    if not matches:
+        raise ValueError(f"No element matching {xpath}")
+    return visible_text(matches[0])
+
+def parse_cards_snapshot(page_source):
+    """Parse every property card from a single page_source snapshot."""
+    tree = lxml_html.fromstring(page_source)
+    cards = tree.xpath(f"//*[{has_class('property-card')}]")
+    logger.info(f"Found {len(cards)} property cards.")
+    rows = []
+    for card in cards:
+        try:
+            rows.append({
+                "Auction ID": element_text(card, ".//p[contains(text(),'Auction ID')]/following-sibling::p"),
+                "Heading": element_text(card, ".//h2"),
+                "Location": element_text(card, f".//*[{has_class('property-location')}]"),
+                "Bank Name": element_text(card, ".//p[contains(text(),'Bank Name')]/following-sibling::div"),
+                "Reserve Price": element_text(card, f".//*[{has_class('reserve_price')}]"),
+                "Auction Date": element_text(card, ".//p[contains(text(),'Auction Date')]/following-sibling::p")
+            })
+        except Exception as e:
+            logger.error("Error parsing card: %s", e)
+    return rows
+
+def parse_cards_webdriver(driver):
+    """Parse every property card through per-element WebDriver lookups."""
+    cards = driver.find_elements(By.CLASS_NAME, "property-card")
+    logger.info(f"Found {len(cards)} property cards.")
+    rows = []
+    for card in cards:
+        try:
+            auction_id = card.find_element(
+                By.XPATH, ".//p[contains(text(),'Auction ID')]/following-sibling::p"
+            ).text
+            heading = card.find_element(By.TAG_NAME, "h2").text
+            location = card.find_element(By.CLASS_NAME, "property-location").text
+            bank_name = card.find_element(
+                By.XPATH, ".//p[contains(text(),'Bank Name')]/following-sibling::div"
+            ).text
+            reserve_price = card.find_element(By.CLASS_NAME, "reserve_price").text
+            auction_date = card.find_element(
+                By.XPATH, ".//p[contains(text(),'Auction Date')]/following-sibling::p"
+            ).text
+
+            rows.append({
+                "Auction ID": auction_id,
+                "Heading": heading,
+                "Location": location,
+                "Bank Name": bank_name,
+                "Reserve Price": reserve_price,
+                "Auction Date": auction_date
+            })
+        except Exception as e:
+            logger.error("Error parsing card: %s", e)
+    return rows
+
+def card_fingerprint(row):
+    """Fingerprint of a card's key fields for incremental mode."""
+    return fields_fingerprint(row[field] for field in KEY_FIELDS)
+
+def parse_cards(driver):
+    """Parse the current results page using the configured PARSE_MODE."""
+    if PARSE_MODE == "webdriver":
+        return parse_cards_webdriver(driver)
+    return parse_cards_snapshot(driver.page_source)
+
+def wait_for_cards(driver):
+    """Wait until the JS-rendered property cards are present."""
+    WebDriverWait(driver, PAGE_TIMEOUT, poll_frequency=0.25).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "property-card"))
+    )
+
+def page_marker(driver):
+    """An element that goes stale once the listing is replaced: the first card, else the document."""
+    cards = driver.find_elements(By.CLASS_NAME, "property-card")
+    return cards[0] if cards else driver.find_element(By.TAG_NAME, "html")
+
+def wait_for_new_page(driver, marker):
+    """Wait until the listing has been replaced after a click and its cards are rendered."""
+    WebDriverWait(driver, PAGE_TIMEOUT, poll_frequency=0.25).until(EC.staleness_of(marker))
+    wait_for_cards(driver)
+
+def open_upcoming_listing(driver, paced):
+    """Load the Albion listing and filter it to upcoming auctions."""
+    try:
+        with paced(START_URL):
+            driver.get(START_URL)
+            driver.maximize_window()
+            wait_for_cards(driver)  # Wait for JS to load content
+    except TimeoutException:
+        logger.warning(f"No property cards rendered within {PAGE_TIMEOUT}s of loading the listing.")
 
     # --- Select "Upcoming" from the dropdown ---
     try:
-        status_dropdown = Select(driver.find_element(By.ID, "sort"))
-        status_dropdown.select_by_value("upcoming")
-        time.sleep(random.uniform(2, 5))  # Wait for the page to reload with filtered data
+        with paced(START_URL):
+            marker = page_marker(driver)
+            status_dropdown = Select(driver.find_element(By.ID, "sort"))
+            status_dropdown.select_by_value("upcoming")
+            wait_for_new_page(driver, marker)  # Wait for the page to reload with filtered data
         logger.info("Selected 'Upcoming' from dropdown.")
     except Exception as e:
         logger.error("Could not select 'Upcoming': %s", e)
 
-    data = []
-    page = 1
+def numbered_page_links(driver):
+    """Map page number to link element for the numbered pagination links currently shown."""
+    links = {}
+    for link in driver.find_elements(By.CSS_SELECTOR, ".pagination a"):
+        text = link.text.strip()
+        if text.isdigit():
+            links[int(text)] = link
+    return links
+
+def get_page_count(driver):
+    """Return the highest page number offered by the pagination bar."""
+    return max(numbered_page_links(driver), default=1)
 
-    while True:
-        logger.info(f"Scraping page {page}...")
-        time.sleep(random.uniform(2, 5))  # Random delay for page load
+def goto_page(driver, target_page, paced):
+    """Navigate from page 1 to target_page, jumping through numbered links where possible."""
+    current = 1
+    while current < target_page:
+        links = numbered_page_links(driver)
+        candidates = [n for n in links if current < n <= target_page]
+        with paced(START_URL):
+            marker = page_marker(driver)
+            if candidates:
+                next_page = max(candidates)
+                driver.execute_script("arguments[0].click();", links[next_page])
+            else:
+                next_btn = driver.find_element(By.CSS_SELECTOR, ".pagination a.next")
+                driver.execute_script("arguments[0].click();", next_btn)
+                next_page = current + 1
+            wait_for_new_page(driver, marker)
+        current = next_page
 
-        cards = driver.find_elements(By.CLASS_NAME, "property-card")
-        logger.info(f"Found {len(cards)} property cards.")
+def split_pages(first_page, last_page, shards):
+    """Split pages first_page..last_page into contiguous ranges, one per shard."""
+    page_count = last_page - first_page + 1
+    shards = max(1, min(shards, page_count))
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = first_page
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
 
-        for card in cards:
+class AlbionSource(Source):
+    """Upcoming auctions listed on albionbankauctions.com."""
+
+    name = "albion"
+    output_prefix = "albion_auctions"
+    fieldnames = ["Auction ID", "Heading", "Location", "Bank Name", "Reserve Price", "Auction Date"]
+
+    def __init__(self, resume=False):
+        super().__init__(resume)
+        self.sink = None
+        self.page_lock = threading.Lock()
+        self.pending_pages = {}
+        self.next_page = 1
+
+    def row_id(self, row):
+        return row["Auction ID"]
+
+    def page_done(self, page, page_rows):
+        """Hand finished pages to the sink in page order, buffering pages that arrive early."""
+        with self.page_lock:
+            self.pending_pages[page] = page_rows
+            while self.next_page in self.pending_pages:
+                self.sink.write_page(self.pending_pages.pop(self.next_page), page=self.next_page)
+                self.next_page += 1
+
+    def flush_pending_pages(self):
+        """Write pages stranded behind a failed shard; the checkpoint stays at the gap."""
+        with self.page_lock:
+            if self.pending_pages:
+                logger.warning(f"Pages {sorted(self.pending_pages)} written after missing page {self.next_page}")
+            for page in sorted(self.pending_pages):
+                self.sink.write_page(self.pending_pages.pop(page))
+
+    def scrape_pages(self, driver, start_page=1, end_page=None, delta=None):
+        """Scrape pages start_page..end_page (until the last page if end_page is None).
+
+        With a DeltaIndex, stop as soon as it reports a run of pages with nothing new.
+        Returns the number of pages and rows scraped.
+        """
+        pages = rows = 0
+        page = start_page
+
+        while True:
+            self.check_cancelled()
+            logger.info(f"Scraping page {page}...")
+
+            parse_start = time.time()
+            page_rows = parse_cards(driver)
+            self.page_done(page, page_rows)
+            pages += 1
+            rows += len(page_rows)
+            self.pool.page_loaded(driver)
+            logger.info(f"Parsed {len(page_rows)} cards on page {page} in {time.time() - parse_start:.2f}s ({PARSE_MODE} mode)")
+
+            if end_page is not None and page >= end_page:
+                break
+            if delta and delta.observe_page([(row["Auction ID"], card_fingerprint(row)) for row in page_rows]):
+                break
+
+            # Try to click the "Next" button
             try:
-                auction_id = card.find_element(
-                    By.XPATH, ".//p[contains(text(),'Auction ID')]/following-sibling::p"
-                ).text
-                heading = card.find_element(By.TAG_NAME, "h2").text
-                location = card.find_element(By.CLASS_NAME, "property-location").text
-                bank_name = card.find_element(
-                    By.XPATH, ".//p[contains(text(),'Bank Name')]/following-sibling::div"
-                ).text
-                reserve_price = card.find_element(By.CLASS_NAME, "reserve_price").text
-                auction_date = card.find_element(
-                    By.XPATH, ".//p[contains(text(),'Auction Date')]/following-sibling::p"
-                ).text
-
-                data.append({
-                    "Auction ID": auction_id,
-                    "Heading": heading,
-                    "Location": location,
-                    "Bank Name": bank_name,
-                    "Reserve Price": reserve_price,
-                    "Auction Date": auction_date
-                })
-            except Exception as e:
-                logger.error("Error parsing card: %s", e)
-
-        # Try to click the "Next" button
-        try:
-            next_btn = driver.find_element(By.CSS_SELECTOR, ".pagination a.next")
-            if "disabled" in next_btn.get_attribute("class"):
-                logger.info("Next button is disabled. Stopping.")
+                next_btn = driver.find_element(By.CSS_SELECTOR, ".pagination a.next")
+                if "disabled" in next_btn.get_attribute("class"):
+                    logger.info("Next button is disabled. Stopping.")
+                    break
+                with self.paced(START_URL):
+                    marker = page_marker(driver)
+                    driver.execute_script("arguments[0].click();", next_btn)
+                    wait_for_new_page(driver, marker)
+                page += 1
+            except (NoSuchElementException, ElementClickInterceptedException):
+                logger.info("No more pages or cannot click next.")
                 break
-            driver.execute_script("arguments[0].click();", next_btn)
-            page += 1
-            time.sleep(random.uniform(2, 5))  # Random delay after clicking next
-        except (NoSuchElementException, ElementClickInterceptedException):
-            logger.info("No more pages or cannot click next.")
-            break
-
-finally:
-    if driver:
-        driver.quit()
-        logger.info("Browser closed")
-    # Additional cleanup
-    cleanup_chrome_processes()
-    if user_data_dir and os.path.exists(user_data_dir):
-        try:
-            shutil.rmtree(user_data_dir)
-            logger.info("Cleaned up user data directory: %s", user_data_dir)
-        except Exception as e:
-            logger.warning("Failed to clean up user data directory: %s", e)
+            except TimeoutException:
+                logger.warning(f"Page {page + 1} did not load within {PAGE_TIMEOUT}s. Stopping.")
+                break
+        return pages, rows
 
-# Write to CSV with date suffix
-today_str = datetime.now().strftime('%Y%m%d')
-output_file = os.path.join(DOWNLOAD_DIR, f"albion_auctions_{today_str}.csv")
-with open(output_file, "w", newline='', encoding="utf-8") as csvfile:
-    fieldnames = ["Auction ID", "Heading", "Location", "Bank Name", "Reserve Price", "Auction Date"]
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(data)
-logger.info(f"Data saved to {output_file}")
+    def scrape_shard(self, start_page, end_page=None, delta=None):
+        """Scrape one page range in its own pooled browser session."""
+        shard_start = time.time()
+        with self.browser() as driver:
+            open_upcoming_listing(driver, self.paced)
+            if start_page > 1:
+                goto_page(driver, start_page, self.paced)
+            pages, rows = self.scrape_pages(driver, start_page, end_page, delta)
+        logger.info(f"Shard pages {start_page}-{end_page or 'end'}: {pages} pages, {rows} rows in {time.time() - shard_start:.1f}s")
+
+    def scrape_sharded(self, first_page, shards):
+        """Find the page count, then scrape page ranges in parallel browser sessions."""
+        with self.browser() as driver:
+            open_upcoming_listing(driver, self.paced)
+            page_count = get_page_count(driver)
+        if first_page > page_count:
+            self.scrape_shard(first_page)
+            return
+        ranges = split_pages(first_page, page_count, shards)
+        logger.info(f"Scraping pages {first_page}-{page_count} in {len(ranges)} shards: {ranges}")
+        if len(ranges) > self.pool.max_size:
+            logger.warning(f"Only {self.pool.max_size} browsers available for {len(ranges)} shards; raise BROWSER_POOL_SIZE")
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            # The last shard keeps paginating past the initial count in case pages were added meanwhile
+            futures = [
+                executor.submit(self.scrape_shard, start, end if i < len(ranges) - 1 else None)
+                for i, (start, end) in enumerate(ranges)
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error("Shard failed: %s", e)
+        self.check_cancelled()
+        self.flush_pending_pages()
+
+    def scrape_into(self, sink):
+        self.sink = sink
+        self.next_page = sink.last_page + 1
+        first_page = self.next_page
+        scrape_start = time.time()
+        if INCREMENTAL:
+            if SHARDS > 1:
+                logger.info("Incremental mode walks pages in order; ignoring ALBION_SHARDS.")
+            delta = DeltaIndex.from_previous_export(
+                self.output_prefix, self.today_str, self.row_id, card_fingerprint
+            )
+            self.scrape_shard(first_page, delta=delta)
+            deadline_of = deadline_reader("Auction Date", SOURCE_SCHEMAS[self.name]["date_format"])
+            sink.write_page(delta.carry_forward(sink.seen_ids, self.scrape_date, deadline_of))
+        elif SHARDS > 1:
+            self.scrape_sharded(first_page, SHARDS)
+        else:
+            self.scrape_shard(first_page)
+        logger.info(f"Scraped pages {first_page}-{sink.last_page} in {time.time() - scrape_start:.1f}s")
+
+if __name__ == "__main__":
+    run_cli(AlbionSource)
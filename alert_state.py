@@ -0,0 +1,145 @@
+"""Which auctions each subscriber has already been alerted about, in SQLite.
+
+Rows are keyed on (subscriber, auction, fingerprint): subscriber is a hash of the email
+address, so the database can be committed with the exports without publishing addresses;
+auction is "<Source>|<Auction ID>"; fingerprint hashes the deadline and reserve price, so a
+moved deadline or a new price makes the auction news again. Entries not matched for
+ALERT_STATE_TTL_DAYS are pruned.
+
+    python alert_state.py --stats
+    python alert_state.py --prune
+"""
+from datetime import date, timedelta
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from entity_resolution import submission_dates
+
+logger = logging.getLogger(__name__)
+
+ALERT_STATE_DB = os.getenv("ALERT_STATE_DB", "alert_state.sqlite")
+# Entries of auctions a subscriber has not matched for this many days are dropped
+TTL_DAYS = int(os.getenv("ALERT_STATE_TTL_DAYS", "30"))
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+def subscriber_id(email):
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+def tracked_values(df):
+    """Deadline as an ISO date or "" and reserve price as Int64 (-1 when missing).
+
+    The history store and the CSV fallback render missing values differently ("-", "nan"),
+    so the fingerprint must not depend on which one the frame came from.
+    """
+    return pd.DataFrame({
+        "deadline": submission_dates(df).dt.strftime("%Y-%m-%d").fillna("").to_numpy(),
+        "price": pd.to_numeric(df["Reserve Price"], errors="coerce").round().astype("Int64").fillna(-1).to_numpy(),
+    })
+
+def auction_keys(df):
+    """(auction key, fingerprint of deadline and reserve price) arrays for the rows of a combined frame."""
+    keys = (df["Source"].astype(str) + "|" + df["Auction ID"].astype(str)).to_numpy()
+    fingerprints = pd.util.hash_pandas_object(tracked_values(df), index=False).to_numpy().view(np.int64)
+    return keys, fingerprints
+
+class AlertState:
+    """SQLite store of (subscriber, auction, fingerprint) alerts with first-sent and last-matched dates."""
+
+    def __init__(self, path=ALERT_STATE_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS notified (
+                subscriber TEXT NOT NULL,
+                auction TEXT NOT NULL,
+                fingerprint INTEGER NOT NULL,
+                first_sent TEXT NOT NULL,
+                last_matched TEXT NOT NULL,
+                PRIMARY KEY (subscriber, auction, fingerprint)
+            ) WITHOUT ROWID
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS notified_last_matched ON notified (last_matched)")
+
+    def close(self):
+        self.connection.close()
+
+    def classify(self, df, matches):
+        """Split each subscriber's matched row positions into new, changed and unchanged auctions.
+
+        matches maps email -> row positions of df. All lookups run as one join against a
+        temporary table, however many subscribers and matches there are.
+        """
+        keys, fingerprints = auction_keys(df)
+        candidates = [
+            (email, subscriber_id(email), int(position), keys[position], int(fingerprints[position]))
+            for email, positions in matches.items() for position in positions
+        ]
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS temp.candidates")
+            self.connection.execute(
+                "CREATE TEMP TABLE candidates (email TEXT, subscriber TEXT, position INTEGER, auction TEXT, fingerprint INTEGER)"
+            )
+            self.connection.executemany("INSERT INTO temp.candidates VALUES (?, ?, ?, ?, ?)", candidates)
+            rows = self.connection.execute("""
+                SELECT c.email, c.position,
+                       EXISTS (SELECT 1 FROM notified n WHERE n.subscriber = c.subscriber AND n.auction = c.auction
+                               AND n.fingerprint = c.fingerprint),
+                       EXISTS (SELECT 1 FROM notified n WHERE n.subscriber = c.subscriber AND n.auction = c.auction)
+                FROM temp.candidates c
+            """).fetchall()
+            self.connection.execute("DROP TABLE temp.candidates")
+        result = {email: {NEW: [], CHANGED: [], UNCHANGED: []} for email in matches}
+        for email, position, same, known in rows:
+            result[email][UNCHANGED if same else CHANGED if known else NEW].append(position)
+        return result
+
+    def record(self, df, matches, today=None):
+        """Mark the matched rows as sent to their subscribers, or refresh last_matched if they already were."""
+        today = (today or date.today()).isoformat()
+        keys, fingerprints = auction_keys(df)
+        with self.connection:
+            self.connection.executemany("""
+                INSERT INTO notified VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (subscriber, auction, fingerprint) DO UPDATE SET last_matched = excluded.last_matched
+            """, [
+                (subscriber_id(email), keys[position], int(fingerprints[position]), today, today)
+                for email, positions in matches.items() for position in positions
+            ])
+
+    def prune(self, ttl_days=TTL_DAYS, today=None):
+        """Drop entries not matched for ttl_days; returns how many were removed."""
+        cutoff = ((today or date.today()) - timedelta(days=ttl_days)).isoformat()
+        with self.connection:
+            removed = self.connection.execute("DELETE FROM notified WHERE last_matched < ?", (cutoff,)).rowcount
+        if removed:
+            self.connection.execute("VACUUM")
+        logger.info(f"Pruned {removed} alert state entries not matched since {cutoff}")
+        return removed
+
+    def stats(self):
+        subscribers, entries = self.connection.execute(
+            "SELECT COUNT(DISTINCT subscriber), COUNT(*) FROM notified"
+        ).fetchone()
+        return {"subscribers": subscribers, "entries": entries, "bytes": os.path.getsize(self.path)}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Inspect or prune the alert state store.")
+    parser.add_argument("--stats", action="store_true", help="Show subscriber and entry counts")
+    parser.add_argument("--prune", action="store_true", help=f"Drop entries not matched for ALERT_STATE_TTL_DAYS ({TTL_DAYS})")
+    args = parser.parse_args()
+    state = AlertState()
+    if args.prune:
+        state.prune()
+    if args.stats:
+        print(state.stats())
+    if not (args.stats or args.prune):
+        parser.print_help()
+    state.close()
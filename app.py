@@ -1,29 +1,79 @@
 import streamlit as st
 import pandas as pd
-import glob
-import os
+from history_store import SCHEMA, SOURCE_PARTITIONS, stored_dates, read_history, as_export_frame
+from money import parse_money
+from export_catalog import get_catalog
+from change_feed import CHANGE_TYPES, read_changes, summarize
+from entity_resolution import deduplicate
 
 st.set_page_config(layout="wide")
 st.title("Auction Notices")
 
-# Find the latest combined CSV file
-csv_files = glob.glob("auction_exports/combined_auctions_*.csv")
-if not csv_files:
+@st.cache_data
+def load_history(start_date, end_date, source='All'):
+    """Rows scraped between the two dates from the Parquet history store, for one source or all.
+
+    Only the displayed columns are decoded, and only the selected source's partitions are read.
+    """
+    columns = SCHEMA.names + (["scrape_date"] if start_date != end_date else [])
+    sources = [SOURCE_PARTITIONS[source]] if source != 'All' else None
+    return as_export_frame(read_history(start_date, end_date, columns=columns, sources=sources))
+
+@st.cache_data
+def load_changes(start_date, end_date):
+    """Day-over-day changes logged for the change dates in the range."""
+    return read_changes(start_date, end_date)
+
+df = None
+dates = stored_dates()
+selected_source = st.sidebar.selectbox("Source:", ['All'] + sorted(SOURCE_PARTITIONS), index=0)
+if dates:
+    # Pick one scrape date or a range of them from the history store
+    picked = st.sidebar.date_input(
+        "Scrape date or range:",
+        value=(dates[-1], dates[-1]),
+        min_value=dates[0],
+        max_value=dates[-1]
+    )
+    picked = picked or (dates[-1],)  # Cleared input: fall back to the latest day
+    start_date, end_date = picked[0], picked[-1]
+    df = load_history(start_date, end_date, selected_source)
+    data_label = f"history store, {start_date}" + (f" to {end_date}" if end_date != start_date else "")
+    file_suffix = f"{start_date:%Y%m%d}.csv" if start_date == end_date else f"{start_date:%Y%m%d}_{end_date:%Y%m%d}.csv"
+else:
+    # Latest good combined CSV according to the export catalog
+    latest = get_catalog().latest("combined")
+    if latest:
+        df = pd.read_csv(latest["path"])
+        if selected_source != 'All':
+            df = df[df['Source'] == selected_source]
+        data_label = latest["path"]
+        file_suffix = latest["scrape_date"].replace("-", "") + ".csv"
+
+if df is None:
     st.error("No combined auction data found.")
 else:
-    latest_csv = max(csv_files, key=lambda x: x.split('_')[-1].split('.')[0])
-    st.write(f"Displaying data from: {latest_csv}")
-    df = pd.read_csv(latest_csv)
+    st.write(f"Displaying data from: {data_label}")
+
+    # The same property listed on several portals shares a cluster_id
+    if 'cluster_id' in df.columns and st.sidebar.checkbox("Hide cross-source duplicates", value=True):
+        listings = len(df)
+        df = deduplicate(df)
+        st.write(f"{listings - len(df)} duplicate listings hidden; `listed_on` shows every portal listing an auction.")
 
     st.write("### Data Preview")
     st.dataframe(df.head())
 
-    # Filter by Source
-    st.write("### Filter Auctions by Source")
-    sources = ['All'] + sorted(df['Source'].unique().tolist())
-    selected_source = st.selectbox("Select Source:", sources, index=0)
-    if selected_source != 'All':
-        df = df[df['Source'] == selected_source]
+    # Filter by Reserve Price
+    st.write("### Filter Auctions by Reserve Price (₹)")
+    df['Reserve Price'] = parse_money(df['Reserve Price'])[0]
+    price_columns = st.columns(2)
+    min_price = price_columns[0].number_input("Minimum reserve price:", min_value=0, value=0, step=100000)
+    max_price = price_columns[1].number_input("Maximum reserve price (0 = no limit):", min_value=0, value=0, step=100000)
+    if min_price:
+        df = df[df['Reserve Price'] >= min_price]
+    if max_price:
+        df = df[df['Reserve Price'] <= max_price]
 
     # Filter by Days Until Submission
     st.write("### Filter Auctions by Days Until Submission")
@@ -71,6 +121,18 @@ else:
     st.download_button(
         label="Download Filtered CSV",
         data=filtered_df.to_csv(index=False).encode('utf-8'),
-        file_name=f"combined_auctions_filtered_{os.path.basename(latest_csv).split('_')[-1]}",
+        file_name=f"combined_auctions_filtered_{file_suffix}",
         mime="text/csv"
     )
+
+if dates:
+    # Changes against the previous scrape for each day in the range
+    st.write("### Changes")
+    changes = load_changes(start_date, end_date)
+    if changes.empty:
+        st.info("No changes logged for the selected dates.")
+    else:
+        st.write(summarize(changes))
+        selected_types = st.multiselect("Change types:", CHANGE_TYPES, default=CHANGE_TYPES)
+        changes = changes[changes['change_type'].isin(selected_types)]
+        st.dataframe(changes)
@@ -0,0 +1,137 @@
+"""Email attachments built in memory, optionally compressed, within the mail provider's size limits.
+
+A table is serialized straight into a buffer as CSV, gzip-compressed CSV, a zip holding the CSV,
+or XLSX (ALERT_ATTACHMENT_FORMAT). Payloads larger than ALERT_ATTACHMENT_MAX_MB are split by rows
+into several attachments. When a message's attachments would exceed MAX_MESSAGE_BYTES, the
+table is written to LINK_DIR and linked from the body instead if ALERT_LINK_BASE_URL is set,
+or left out with a note otherwise.
+"""
+import base64
+import copy
+import gzip
+import io
+import logging
+import math
+import os
+import time
+import zipfile
+from datetime import date
+import numpy as np
+
+try:
+    import openpyxl  # noqa: F401  (pandas' XLSX writer)
+except ImportError:  # XLSX output falls back to CSV
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+# csv, gzip, zip or xlsx (needs openpyxl)
+ATTACHMENT_FORMAT = os.getenv("ALERT_ATTACHMENT_FORMAT", "csv")
+# Largest single attachment after base64 encoding; bigger tables are split by rows
+MAX_PART_BYTES = int(float(os.getenv("ALERT_ATTACHMENT_MAX_MB", "10")) * 1024 * 1024)
+# SendGrid rejects messages over 30 MB; keep all attachments of one message below this
+MAX_MESSAGE_BYTES = 28 * 1024 * 1024
+# Tables that do not fit in the message are written here and linked as ALERT_LINK_BASE_URL/<file>
+LINK_DIR = os.path.join("auction_exports", "alert_files")
+LINK_BASE_URL = os.getenv("ALERT_LINK_BASE_URL", "")
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "gzip": (".csv.gz", "application/gzip"),
+    "zip": (".zip", "application/zip"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def serialize(df, name, fmt):
+    """Bytes of a frame in one of FORMATS, built in memory."""
+    if fmt == "xlsx":
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False, engine="openpyxl")
+        return buffer.getvalue()
+    data = df.to_csv(index=False).encode("utf-8")
+    if fmt == "gzip":
+        return gzip.compress(data, mtime=0)
+    if fmt == "zip":
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(f"{name}.csv", data)
+        return buffer.getvalue()
+    return data
+
+def encoded_size(size):
+    """Length of `size` bytes after base64 encoding."""
+    return 4 * math.ceil(size / 3)
+
+def split_payloads(df, name, fmt, part_bytes):
+    """Serialized parts of a frame, each within part_bytes once encoded; more row chunks until they fit."""
+    payload = serialize(df, name, fmt)
+    if encoded_size(len(payload)) <= part_bytes or len(df) <= 1:
+        return [payload]
+    parts = math.ceil(encoded_size(len(payload)) / part_bytes)
+    while True:
+        chunks = np.array_split(np.arange(len(df)), min(parts, len(df)))
+        payloads = [serialize(df.iloc[chunk], f"{name}_part{i}of{len(chunks)}", fmt) for i, chunk in enumerate(chunks, 1)]
+        if all(encoded_size(len(p)) <= part_bytes for p in payloads) or parts >= len(df):
+            return payloads
+        parts *= 2
+
+class AttachmentBuilder:
+    """Collects one message's attachments as (filename, MIME type, base64 content) tuples."""
+
+    def __init__(self, fmt=ATTACHMENT_FORMAT, part_bytes=MAX_PART_BYTES, message_bytes=MAX_MESSAGE_BYTES):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown attachment format {fmt!r}; expected one of {sorted(FORMATS)}")
+        if fmt == "xlsx" and openpyxl is None:
+            logger.warning("openpyxl is not installed; attaching CSV instead of XLSX")
+            fmt = "csv"
+        self.fmt = fmt
+        self.part_bytes = part_bytes
+        self.remaining = message_bytes
+        self.attachments = []
+
+    def copy(self):
+        """A builder starting from this one's attachments and remaining size, for one message's own additions."""
+        other = copy.copy(self)
+        other.attachments = list(self.attachments)
+        return other
+
+    def add(self, df, name, label="Full details"):
+        """Attach a frame as name + extension, split or linked as needed; returns a sentence for the body."""
+        extension, mime_type = FORMATS[self.fmt]
+        start = time.time()
+        payloads = split_payloads(df, name, self.fmt, self.part_bytes)
+        size = sum(len(payload) for payload in payloads)
+        encoded = sum(encoded_size(len(payload)) for payload in payloads)
+        logger.info(f"{name}: {len(df)} rows as {self.fmt} in {time.time() - start:.3f}s, "
+                    f"{size / 1024:.1f} KB ({encoded / 1024:.1f} KB encoded) in {len(payloads)} part(s)")
+
+        if encoded > self.remaining:
+            return self.link(df, name, label, encoded)
+        self.remaining -= encoded
+        if len(payloads) == 1:
+            filenames = [name + extension]
+        else:
+            filenames = [f"{name}_part{i}of{len(payloads)}{extension}" for i in range(1, len(payloads) + 1)]
+        for filename, payload in zip(filenames, payloads):
+            self.attachments.append((filename, mime_type, base64.b64encode(payload).decode()))
+        if len(filenames) == 1:
+            return f"{label} are attached in {filenames[0]}."
+        return f"{label} are attached in {len(filenames)} parts, {filenames[0]} to {filenames[-1]}."
+
+    def link(self, df, name, label, encoded):
+        """Write a table too large for the message to LINK_DIR and return a sentence with its URL."""
+        if not LINK_BASE_URL:
+            logger.warning(f"{name} ({encoded / 1024 / 1024:.1f} MB encoded) does not fit in the message; "
+                           f"set ALERT_LINK_BASE_URL to link it instead")
+            return f"{label} are too large to attach ({encoded / 1024 / 1024:.1f} MB)."
+        extension, _ = FORMATS[self.fmt]
+        filename = f"{name}_{date.today():%Y%m%d}{extension}"
+        os.makedirs(LINK_DIR, exist_ok=True)
+        target = os.path.join(LINK_DIR, filename)
+        temp_file = f"{target}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            f.write(serialize(df, name, self.fmt))
+        os.replace(temp_file, target)
+        logger.info(f"{name} does not fit in the message; wrote {target} to link instead")
+        return f"{label} are too large to attach; download them from {LINK_BASE_URL.rstrip('/')}/{filename}"
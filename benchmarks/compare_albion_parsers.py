@@ -0,0 +1,58 @@
+"""Check that Albion's snapshot parser reads the same fields as the WebDriver parser.
+
+Loads fixture pages in a pooled Chrome and compares parse_cards_snapshot(page_source) with
+parse_cards_webdriver field by field. Every fifth fixture card has line breaks, hidden and
+script content inside its fields. Exits 1 on any difference:
+
+    python -m benchmarks.compare_albion_parsers --pages 3 --rows 20
+"""
+import argparse
+import logging
+import sys
+from albion_bank import parse_cards_snapshot, parse_cards_webdriver, wait_for_cards
+from benchmarks.fixture_server import start_fixture_server
+from browser_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+def compare_page(driver, url):
+    """(cards compared, list of (auction ID, field, webdriver value, snapshot value) differences)."""
+    driver.get(url)
+    wait_for_cards(driver)
+    expected = parse_cards_webdriver(driver)
+    actual = parse_cards_snapshot(driver.page_source)
+    differences = []
+    if len(expected) != len(actual):
+        differences.append(("-", "card count", len(expected), len(actual)))
+    for old, new in zip(expected, actual):
+        for field, value in old.items():
+            if new.get(field) != value:
+                differences.append((old["Auction ID"], field, value, new.get(field)))
+    return len(expected), differences
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Compare Albion's snapshot and WebDriver card parsers.")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=20)
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server(args.pages, args.rows)
+    cards, differences = 0, []
+    try:
+        with get_pool().browser() as driver:
+            for page in range(1, args.pages + 1):
+                compared, page_differences = compare_page(driver, f"{base_url}/albion/?sort=upcoming&page={page}")
+                cards += compared
+                differences += page_differences
+    finally:
+        get_pool().close()
+        server.shutdown()
+
+    for auction_id, field, expected, actual in differences:
+        print(f"{auction_id} {field}: webdriver {expected!r}, snapshot {actual!r}")
+    print(f"{cards} cards compared, {len(differences)} differences")
+    return 1 if differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
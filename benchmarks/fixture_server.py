@@ -0,0 +1,199 @@
+"""Local stand-in for the four auction sites, with the DOM shapes the scrapers expect.
+
+Serves synthetic pages for Albion (/albion/), bank_e (/bank_e/), web3 (/web3/) and the
+IBBI list page with its export form (/en/liquidation-auction-notices/lists). Page count,
+rows per page and an artificial per-response latency are configurable.
+
+    python -m benchmarks.fixture_server --pages 10 --rows 20 --latency-ms 150
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import html
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BANKS = ["Canara Bank", "State Bank of India", "HDFC Bank", "Equitas Small Finance Bank", "Punjab National Bank"]
+CITIES = ["Kolkata", "Coimbatore", "Pune", "Nagpur", "Lucknow"]
+
+def page_links(page, pages, next_class="next"):
+    """Numbered pagination links plus a Next link, disabled on the last page."""
+    links = "".join(f'<a href="?sort=upcoming&page={n}">{n}</a>' for n in range(max(1, page - 2), min(pages, page + 2) + 1))
+    links += f'<a href="?sort=upcoming&page={pages}">{pages}</a>' if page + 2 < pages else ""
+    if page < pages:
+        links += f'<a class="{next_class}" href="?sort=upcoming&page={page + 1}">Next</a>'
+    else:
+        links += f'<a class="{next_class} disabled" href="#">Next</a>'
+    return links
+
+def albion_page(page, pages, rows):
+    cards = []
+    for i in range(rows):
+        auction_id = 60000 + (page - 1) * rows + i
+        city, bank = CITIES[i % len(CITIES)], BANKS[i % len(BANKS)]
+        location = f"{city}, India"
+        if i % 5 == 4:
+            # Markup where plain text_content() differs from what WebElement.text shows
+            location = f"{city},<br>\n    India"
+            bank += f'<span style="display: none"> (archived)</span><script>track({auction_id})</script>'
+        cards.append(f"""
+<div class="property-card">
+  <img src="/static/photo_{auction_id}.jpg">
+  <h2>Residential Flat in {city}</h2>
+  <p class="property-location">{location}</p>
+  <p>Auction ID</p><p>{auction_id}</p>
+  <p>Bank Name</p><div>{bank}</div>
+  <span class="reserve_price">&#8377;{(i + 1) * 100000:,}</span>
+  <p>Auction Date</p><p>{(i % 28) + 1:02d}/09/2025</p>
+</div>""")
+    return f"""<html><head><link rel="stylesheet" href="/static/site.css"></head><body>
+<select id="sort" onchange="location.href='?sort=' + this.value + '&page=1'">
+  <option value="all">All</option><option value="upcoming">Upcoming</option>
+</select>
+{''.join(cards)}
+<div class="pagination">{page_links(page, pages)}</div>
+</body></html>"""
+
+def bank_e_page(page, pages, rows):
+    header = ["", "Auction ID", "Bank/Organisation Name", "Asset on Auction", "City/District",
+              "Sealed Bid Submission last date", "Reserve Price", "EMD", "Event Type", "DRT Name", "", "", "", "", ""]
+    body = ["<tr>" + "".join(f"<th>{h}</th>" for h in header) + "</tr>"]
+    for i in range(rows):
+        auction_id = 190000 + (page - 1) * rows + i
+        cells = ["", auction_id, BANKS[i % len(BANKS)], f"Plot No. {i} I am interested", CITIES[i % len(CITIES)],
+                 f"{(i % 28) + 1:02d} Jul 2025", f"{(i + 1) * 5:,},00,000.00", f"{i + 1},00,000.00",
+                 "SARFAESI", "--", auction_id - 900, 1, "Immovable", "Land And Building", 0]
+        body.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+    next_link = (f'<a href="?page={page + 1}">Next</a>' if page < pages else '<a class="disabled" href="#">Next</a>')
+    return f"""<html><head><link rel="stylesheet" href="/static/site.css"></head><body>
+<table>{''.join(body)}</table>
+<div class="paging">{next_link}</div>
+</body></html>"""
+
+def web3_page(page, pages, rows):
+    links = "".join(
+        f'<tr><td>{page}-{i}</td><td><a id="view_{i}" href="/web3/detail?id={(page - 1) * rows + i}" target="_blank">View</a></td></tr>'
+        for i in range(rows)
+    )
+    forward = f'<a id="linkFwd" href="?page={page + 1}">&gt;</a>' if page < pages else ""
+    return f"""<html><body>
+<a id="closingWeekTab" href="?page=1">Closing within 7 days</a>
+<table>{links}</table>
+{forward}
+</body></html>"""
+
+def web3_detail(auction_number):
+    fields = {
+        "Organisation Chain": f"Govt of Maharashtra||Forest Department||Division {auction_number % 7}",
+        "Auction ID": f"2025_MH_{30000 + auction_number}",
+        "EMD Amount in ₹": f"{(auction_number % 9 + 1) * 1000:,}",
+        "Starting Price in ₹": f"{(auction_number % 9 + 1) * 50000:,}",
+        "Submission Start Date": "28-Jun-2025 09:30 AM",
+        "Submission End Date": "30-Jun-2025 11:10 AM",
+        "Auction Start Date": "30-Jun-2025 11:15 AM",
+        "Product Category": "Timber",
+    }
+    rows = "".join(f"<tr><td>{html.escape(k)}</td><td>{html.escape(v)}</td></tr>" for k, v in fields.items())
+    return f"<html><body><table>{rows}</table></body></html>"
+
+def ibbi_list_page():
+    return """<html><body>
+<form method="post" action="/en/liquidation-auction-notices/lists">
+  <input type="hidden" name="form_token" value="fixture-token">
+  <input type="text" name="title" value="">
+  <input type="submit" name="search" value="Search">
+  <input type="submit" name="export_excel" value="EXPORT">
+</form>
+</body></html>"""
+
+def ibbi_export(rows):
+    header = ["Announcement Type", "Date of issue of auction notice", "Name of Corporate Debtor", "CIN No.",
+              "Name of Insolvency Professional", "Date of Auction", "Reserve Price", "Last date of Submission"]
+    lines = ["\t".join(header)]
+    for i in range(rows):
+        lines.append("\t".join([
+            "Issue of Auction Notice", "25-05-2025", f"Fixture Debtor {i} Private Limited",
+            f"U{i:05d}MH2012PTC{i:06d}", "Mr. Fixture Professional", "17-06-2025",
+            str((i + 1) * 100000), "15-06-2025",
+        ]))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    pages = 5
+    rows = 20
+    latency = 0.0
+
+    def send_body(self, body, content_type="text/html; charset=utf-8", extra_headers=None):
+        time.sleep(self.latency)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        page = min(max(int(query.get("page", ["1"])[0]), 1), self.pages)
+        if url.path == "/albion/":
+            self.send_body(albion_page(page, self.pages, self.rows))
+        elif url.path == "/bank_e/":
+            self.send_body(bank_e_page(page, self.pages, self.rows))
+        elif url.path == "/web3/":
+            self.send_body(web3_page(page, self.pages, self.rows))
+        elif url.path == "/web3/detail":
+            self.send_body(web3_detail(int(query.get("id", ["0"])[0])))
+        elif url.path == "/en/liquidation-auction-notices/lists":
+            self.send_body(ibbi_list_page(), extra_headers={"Set-Cookie": "SESSfixture=1; Path=/"})
+        elif url.path.startswith("/static/"):
+            # Stand-ins for the images and stylesheets the real sites load
+            self.send_body(b"\0" * 20000, content_type="application/octet-stream")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if url.path == "/en/liquidation-auction-notices/lists" and "export_excel" in form:
+            self.send_body(ibbi_export(self.pages * self.rows), content_type="application/vnd.ms-excel",
+                           extra_headers={"Content-Disposition": 'attachment; filename="auction_notices.xls"'})
+        else:
+            self.send_error(400)
+
+    def log_message(self, format, *args):
+        logger.debug("fixture: " + format, *args)
+
+def start_fixture_server(pages=5, rows=20, latency_ms=0, port=0):
+    """Start the fixture server in a background thread; returns (server, base_url)."""
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,), {
+        "pages": pages, "rows": rows, "latency": latency_ms / 1000.0,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    logger.info(f"Fixture server running at {base_url} ({pages} pages x {rows} rows, {latency_ms} ms latency)")
+    return server, base_url
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve local fixture versions of the auction sites.")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    server, _ = start_fixture_server(args.pages, args.rows, args.latency_ms, args.port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
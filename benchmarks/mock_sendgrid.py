@@ -0,0 +1,92 @@
+"""Local stand-in for SendGrid's v3 mail send endpoint and for chat webhooks.
+
+Accepts POST /v3/mail/send like SendGrid (202, empty body) and any JSON POSTed to /webhook
+(200), keeps every request body and optionally appends it to a JSON-lines file, so
+email_alert.py can be run end to end without sending anything. --fail-first answers the first
+requests with 503 to exercise the notifier's retries:
+
+    python -m benchmarks.mock_sendgrid --port 8025 --log sent.jsonl
+    SENDGRID_API_HOST=http://127.0.0.1:8025 SENDGRID_API_KEY=test SENDER_EMAIL=alerts@example.com \
+        ALERT_WEBHOOK_URL=http://127.0.0.1:8025/webhook python email_alert.py
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class MockSendGridHandler(BaseHTTPRequestHandler):
+    requests = None
+    log_file = None
+    failures_left = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.path not in ("/v3/mail/send", "/webhook"):
+            self.send_error(404)
+            return
+        if self.path == "/v3/mail/send" and not self.headers.get("Authorization", "").startswith("Bearer "):
+            self.send_error(401)
+            return
+        try:
+            message = json.loads(body)
+        except ValueError:
+            self.send_error(400)
+            return
+        with self.lock:
+            if self.failures_left > 0:
+                type(self).failures_left -= 1
+                self.send_error(503)
+                return
+            self.requests.append(message)
+            if self.log_file:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(message) + "\n")
+        if self.path == "/webhook":
+            logger.info(f"mock webhook: received {message.get('text', message)!r} "
+                        f"(Idempotency-Key {self.headers.get('Idempotency-Key')})")
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        recipients = sum(len(p.get("to", [])) for p in message.get("personalizations", []))
+        logger.info(f"mock SendGrid: accepted a message with {len(message.get('personalizations', []))} "
+                    f"personalizations for {recipients} recipients")
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug("mock SendGrid: " + format, *args)
+
+def start_mock_sendgrid(port=0, log_file=None, fail_first=0):
+    """Start the mock in a background thread; returns (server, base_url, list of received messages)."""
+    received = []
+    handler = type("ConfiguredMockSendGridHandler", (MockSendGridHandler,), {
+        "requests": received, "log_file": log_file, "failures_left": fail_first,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-sendgrid", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    logger.info(f"Mock SendGrid running at {base_url}")
+    return server, base_url, received
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve a local mock of SendGrid's mail send endpoint.")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--log", help="Append every received message to this JSON-lines file")
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer this many requests with 503 first")
+    args = parser.parse_args()
+    server, _, _ = start_mock_sendgrid(args.port, args.log, args.fail_first)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
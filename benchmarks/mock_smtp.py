@@ -0,0 +1,76 @@
+"""Local stand-in SMTP server that keeps every message instead of relaying it.
+
+Needs aiosmtpd (pip install aiosmtpd), which is only used here. Rejects the first --fail-first
+messages with a temporary 451 to exercise the notifier's retries:
+
+    python -m benchmarks.mock_smtp --port 8026 --log smtp.jsonl
+    NOTIFY_EMAIL_CHANNEL=smtp SMTP_HOST=127.0.0.1 SMTP_PORT=8026 SMTP_STARTTLS=0 SENDER_EMAIL=alerts@example.com python email_alert.py
+"""
+from email import message_from_bytes, policy
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+from aiosmtpd.controller import Controller
+
+logger = logging.getLogger(__name__)
+
+class MockSMTPHandler:
+    def __init__(self, log_file=None, fail_first=0):
+        self.received = []
+        self.log_file = log_file
+        self.failures_left = fail_first
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            if self.failures_left > 0:
+                self.failures_left -= 1
+                logger.info("mock SMTP: rejecting a message with 451 as asked")
+                return "451 Temporary failure, try again later"
+            message = message_from_bytes(envelope.content, policy=policy.default)
+            summary = {
+                "from": envelope.mail_from,
+                "to": envelope.rcpt_tos,
+                "subject": message["Subject"],
+                "message_id": message["Message-ID"],
+                "attachments": [part.get_filename() for part in message.iter_attachments()],
+                "bytes": len(envelope.content),
+            }
+            self.received.append(summary)
+            if self.log_file:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(summary) + "\n")
+        logger.info(f"mock SMTP: accepted {summary['subject']!r} for {', '.join(envelope.rcpt_tos)}")
+        return "250 Message accepted for delivery"
+
+def start_mock_smtp(port=0, log_file=None, fail_first=0):
+    """Start the mock in a background thread; returns (controller, port, list of received message summaries)."""
+    if not port:
+        # The controller connects to its own port once started, so it needs a concrete one
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+    # aiosmtpd logs every SMTP command at INFO
+    logging.getLogger("mail.log").setLevel(logging.WARNING)
+    handler = MockSMTPHandler(log_file, fail_first)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    logger.info(f"Mock SMTP running at 127.0.0.1:{port}")
+    return controller, port, handler.received
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve a local SMTP sink for alert emails.")
+    parser.add_argument("--port", type=int, default=8026)
+    parser.add_argument("--log", help="Append a summary of every received message to this JSON-lines file")
+    parser.add_argument("--fail-first", type=int, default=0, help="Reject this many messages with 451 first")
+    args = parser.parse_args()
+    controller, _, _ = start_mock_smtp(args.port, args.log, args.fail_first)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        controller.stop()
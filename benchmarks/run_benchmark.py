@@ -0,0 +1,156 @@
+"""Offline scraper benchmark against the local fixture sites.
+
+Reports pages/sec, rows/sec, WebDriver calls per row, time throttled by the rate limiter and
+peak RSS (Python + Chrome) per source.
+
+    python -m benchmarks.run_benchmark --pages 10 --rows 20 --latency-ms 100 --sources albion bank_e
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import psutil
+from selenium.webdriver.remote.webdriver import WebDriver
+from benchmarks.fixture_server import start_fixture_server
+from browser_pool import get_pool
+from checkpoint import RowCollector
+from run_scrapers import load_source_class
+
+logger = logging.getLogger(__name__)
+
+SOURCE_NAMES = ["albion", "bank_e", "web3", "ibbi"]
+
+class WebDriverCallCounter:
+    """Counts WebDriver protocol commands by wrapping WebDriver.execute."""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.original = WebDriver.execute
+
+    def __enter__(self):
+        counter = self
+        original = self.original
+
+        def counting_execute(driver, driver_command, params=None):
+            with counter.lock:
+                counter.calls += 1
+            return original(driver, driver_command, params)
+
+        WebDriver.execute = counting_execute
+        return self
+
+    def __exit__(self, *exc):
+        WebDriver.execute = self.original
+
+class PeakRssSampler:
+    """Samples the RSS of this process and its children (Chrome, chromedriver)."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name="rss-sampler", daemon=True)
+
+    def current_rss(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    def sample(self):
+        while not self.stop_event.is_set():
+            self.peak = max(self.peak, self.current_rss())
+            self.stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.current_rss())
+
+def configure_sources(base_url):
+    """Point every scraper at the fixture server; must run before the scripts are loaded."""
+    os.environ["ALBION_URL"] = f"{base_url}/albion/"
+    os.environ["BANK_E_URL"] = f"{base_url}/bank_e/"
+    os.environ["WEB3_URL"] = f"{base_url}/web3/"
+    os.environ["IBBI_BASE_URL"] = base_url
+
+def benchmark_source(name):
+    """Scrape one source against the fixtures and return its metrics."""
+    source = load_source_class(name)()
+    start = time.time()
+    with WebDriverCallCounter() as counter, PeakRssSampler() as rss:
+        if name == "ibbi":
+            rows = source.scrape()
+            pages = 1
+            if os.path.exists(source.export_file):
+                os.remove(source.export_file)
+        else:
+            collector = RowCollector(key=source.row_id)
+            source.scrape_into(collector)
+            rows, pages = collector.rows, collector.last_page
+    elapsed = time.time() - start
+    return {
+        "source": name,
+        "pages": pages,
+        "rows": len(rows),
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(pages / elapsed, 3) if elapsed else None,
+        "rows_per_sec": round(len(rows) / elapsed, 2) if elapsed else None,
+        "webdriver_calls": counter.calls,
+        "webdriver_calls_per_row": round(counter.calls / len(rows), 2) if rows else None,
+        "throttled_sec": round(source.throttled, 2),
+        "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+    }
+
+def print_report(results):
+    columns = ["source", "pages", "rows", "seconds", "pages_per_sec", "rows_per_sec",
+               "webdriver_calls_per_row", "throttled_sec", "peak_rss_mb"]
+    widths = {c: max(len(c), *(len(str(r.get(c))) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for result in results:
+        print("  ".join(str(result.get(c)).ljust(widths[c]) for c in columns))
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against local fixture sites.")
+    parser.add_argument("--sources", nargs="+", choices=SOURCE_NAMES, default=SOURCE_NAMES)
+    parser.add_argument("--pages", type=int, default=5, help="Pages per fixture site")
+    parser.add_argument("--rows", type=int, default=20, help="Rows per fixture page")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Artificial latency per fixture response")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server(args.pages, args.rows, args.latency_ms)
+    configure_sources(base_url)
+    results = []
+    try:
+        for name in args.sources:
+            try:
+                results.append(benchmark_source(name))
+            except Exception as e:
+                logger.error(f"Benchmark of {name} failed: {e}")
+                results.append({"source": name, "error": str(e)})
+    finally:
+        get_pool().close()
+        server.shutdown()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0 if all("error" not in r for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from contextlib import contextmanager
+import atexit
+import json
+import os
+import shutil
+import psutil
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Output directory
+DOWNLOAD_DIR = "auction_exports"
+
+# Maximum number of Chrome instances alive at once
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+# Restart a browser after it has served this many pages
+RECYCLE_AFTER_PAGES = int(os.getenv("BROWSER_RECYCLE_AFTER_PAGES", "200"))
+
+# Set to 0 to let Chrome load everything, e.g. to measure the savings of blocking
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "1") == "1"
+# Resources the scrapers never read: images, fonts, media, stylesheets and third-party trackers
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*.css",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*scorecardresearch.com*",
+]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
+
+def setup_chrome_options(user_data_dir, download_dir=DOWNLOAD_DIR):
+    """Set up Chrome options for headless browsing."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    # Network events are read back from the performance log to report blocked requests and bytes
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    chrome_options.add_experimental_option('prefs', {
+        "download.default_directory": os.path.abspath(download_dir),
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True,
+        "safebrowsing.enabled": True
+    })
+    return chrome_options
+
+class NetworkStats:
+    """Request, byte and blocked-request counts collected from Chrome's performance log."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = {}
+
+    def collect(self, driver):
+        """Drain the driver's performance log into the counters."""
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                self.requests += 1
+            elif method == "Network.loadingFinished":
+                self.bytes += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                resource_type = params.get("type", "Other")
+                self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+
+    def summary(self):
+        blocked = sum(self.blocked.values())
+        by_type = ", ".join(f"{t} {n}" for t, n in sorted(self.blocked.items())) or "none"
+        return (f"{self.requests} requests, {self.bytes / 1024:.0f} KB downloaded, "
+                f"{blocked} requests blocked ({by_type})")
+
+class PooledBrowser:
+    """A Chrome instance started by the pool, with the processes and profile it owns."""
+
+    def __init__(self, driver, user_data_dir):
+        self.driver = driver
+        self.user_data_dir = user_data_dir
+        self.pages = 0
+        self.stats = NetworkStats()
+        self.processes = []
+        self.track_processes()
+
+    def track_processes(self):
+        """Remember chromedriver and every Chrome process spawned below it."""
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            known = {proc.pid for proc in self.processes}
+            for proc in [root] + root.children(recursive=True):
+                if proc.pid not in known:
+                    self.processes.append(proc)
+        except (AttributeError, psutil.NoSuchProcess):
+            pass
+
+    def quit(self):
+        """Quit the driver, kill any of our processes left behind and remove the profile."""
+        self.track_processes()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning("Failed to quit Chrome WebDriver: %s", e)
+        for proc in self.processes:
+            # is_running() also guards against the PID having been reused by another process
+            if proc.is_running():
+                try:
+                    proc.kill()
+                    logger.info(f"Killed leftover pool process: {proc.name()} (PID: {proc.pid})")
+                except psutil.NoSuchProcess:
+                    pass
+        if os.path.exists(self.user_data_dir):
+            try:
+                shutil.rmtree(self.user_data_dir)
+                logger.info("Cleaned up user data directory: %s", self.user_data_dir)
+            except Exception as e:
+                logger.warning("Failed to clean up user data directory: %s", e)
+
+class BrowserPool:
+    """Keeps warm headless Chrome instances and hands them out to scrapers."""
+
+    def __init__(self, max_size=POOL_SIZE, recycle_after=RECYCLE_AFTER_PAGES):
+        self.max_size = max_size
+        self.recycle_after = recycle_after
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.leased = {}
+        self.closed = False
+
+    def start_browser(self):
+        """Cold-start a new Chrome instance with a private profile."""
+        user_data_dir = tempfile.mkdtemp(prefix="chrome_user_data_pool_")
+        logger.info("Starting Chrome WebDriver...")
+        try:
+            driver = webdriver.Chrome(options=setup_chrome_options(user_data_dir))
+        except Exception:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            raise
+        browser = PooledBrowser(driver, user_data_dir)
+        chromedriver_version = driver.capabilities.get('chrome', {}).get('chromedriverVersion', 'unknown')
+        logger.info(f"Chrome WebDriver started (ChromeDriver {chromedriver_version}, PID {driver.service.process.pid}).")
+        return browser
+
+    def reset(self, browser, download_dir, allowed_resources=()):
+        """Return a reused browser to a clean single-tab state with the lease's blocking rules."""
+        driver = browser.driver
+        for handle in driver.window_handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": os.path.abspath(download_dir)
+        })
+        blocked = [p for p in BLOCKED_URL_PATTERNS if p not in allowed_resources] if BLOCK_RESOURCES else []
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+        # Drain events from before this lease so its report only covers the lease
+        NetworkStats().collect(driver)
+        browser.stats = NetworkStats()
+
+    def acquire(self, download_dir=DOWNLOAD_DIR, allowed_resources=()):
+        """Lease a browser, reusing a warm one when available.
+
+        allowed_resources lists entries of BLOCKED_URL_PATTERNS this lease still needs.
+        """
+        if self.closed:
+            raise RuntimeError("Browser pool is closed")
+        self.slots.acquire()
+        try:
+            while True:
+                with self.lock:
+                    browser = self.idle.pop() if self.idle else None
+                if browser is None:
+                    browser = self.start_browser()
+                    logger.info("Leased new browser")
+                try:
+                    self.reset(browser, download_dir, allowed_resources)
+                    break
+                except Exception as e:
+                    logger.warning("Discarding unhealthy browser: %s", e)
+                    browser.quit()
+            with self.lock:
+                self.leased[id(browser.driver)] = browser
+            return browser.driver
+        except Exception:
+            self.slots.release()
+            raise
+
+    def page_loaded(self, driver):
+        """Count a page served by a leased browser towards its recycle limit."""
+        browser = self.leased.get(id(driver))
+        if browser:
+            browser.pages += 1
+            browser.stats.collect(driver)
+
+    def release(self, driver, broken=False):
+        """Return a leased browser, quitting it if broken or past its recycle limit."""
+        with self.lock:
+            browser = self.leased.pop(id(driver), None)
+        if browser is None:
+            return
+        browser.stats.collect(driver)
+        logger.info(f"Browser lease network usage: {browser.stats.summary()}")
+        try:
+            if broken or self.closed or browser.pages >= self.recycle_after:
+                logger.info(f"Recycling browser after {browser.pages} pages")
+                browser.quit()
+            else:
+                browser.track_processes()
+                with self.lock:
+                    self.idle.append(browser)
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def browser(self, download_dir=DOWNLOAD_DIR, allowed_resources=()):
+        """Context manager leasing a driver for the duration of a block."""
+        driver = self.acquire(download_dir, allowed_resources)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self):
+        """Quit every browser owned by this pool; processes started elsewhere are left alone."""
+        with self.lock:
+            self.closed = True
+            browsers = self.idle + list(self.leased.values())
+            self.idle = []
+            self.leased = {}
+        for browser in browsers:
+            browser.quit()
+        if browsers:
+            logger.info("Browser pool closed (%d browsers)", len(browsers))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide browser pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
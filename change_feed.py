@@ -0,0 +1,209 @@
+"""Day-over-day changes between snapshots in the history store.
+
+A change log is kept in auction_changes/change_date=<YYYY-MM-DD>/part-0.parquet, one partition
+per stored scrape date, diffed against the previous stored date. Each partition records content
+hashes of the two snapshots it was diffed from, and update_change_log() only recomputes days
+whose hashes no longer match. File times are not used: every checkout of the committed store
+gives its files new ones.
+
+    python change_feed.py --update                        # bring the change log up to date
+    python change_feed.py --diff 2025-06-01 2025-06-30    # compare any two stored dates
+"""
+from datetime import date
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from export_catalog import file_digest
+from history_store import HISTORY_DIR, read_day, stored_dates
+
+logger = logging.getLogger(__name__)
+
+CHANGES_DIR = os.getenv("CHANGES_DIR", "auction_changes")
+
+NEW = "new"
+WITHDRAWN = "withdrawn"
+PRICE_CHANGED = "price_changed"
+DEADLINE_MOVED = "deadline_moved"
+CHANGE_TYPES = [NEW, WITHDRAWN, PRICE_CHANGED, DEADLINE_MOVED]
+
+KEY = ["Source", "Auction ID"]
+# Fields whose change is reported; together they form the row fingerprint
+TRACKED = ["Reserve Price", "last_date_of_submission"]
+DETAILS = ["Bank/Organisation Name", "City/District/Location", "Category"]
+SNAPSHOT_COLUMNS = KEY + DETAILS + TRACKED + ["days_until_submission"]
+
+CHANGE_SCHEMA = pa.schema([
+    ("previous_date", pa.date32()),
+    ("change_type", pa.string()),
+    ("Source", pa.string()),
+    ("Auction ID", pa.string()),
+    ("Bank/Organisation Name", pa.string()),
+    ("City/District/Location", pa.string()),
+    ("Category", pa.string()),
+    ("old_reserve_price", pa.int64()),
+    ("Reserve Price", pa.int64()),
+    ("old_last_date", pa.date32()),
+    ("last_date_of_submission", pa.date32()),
+    ("days_until_submission", pa.int32()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("change_date", pa.date32())]), flavor="hive")
+# Parquet metadata key of a change partition holding {scrape date: snapshot digest} of its inputs
+SNAPSHOTS_KEY = b"snapshot_digests"
+
+def fingerprinted(df):
+    """Drop exact repeats and add a hash of the tracked fields."""
+    df = df.drop_duplicates(subset=KEY + TRACKED).reset_index(drop=True)
+    df["fingerprint"] = pd.util.hash_pandas_object(df[TRACKED], index=False).to_numpy()
+    return df
+
+def differs(old, new):
+    """Element-wise inequality that treats two missing values as equal."""
+    return pd.util.hash_pandas_object(old, index=False).to_numpy() != pd.util.hash_pandas_object(new, index=False).to_numpy()
+
+def diff_snapshots(old, new, previous_date=None):
+    """Compare two snapshot frames and return one row per change.
+
+    Rows are hash-joined on (Source, Auction ID, fingerprint) to drop everything unchanged.
+    An Auction ID left with exactly one unmatched row on each side is a changed auction
+    (one row per changed field). Any other leftover row is new or withdrawn. IBBI lists
+    several notices under one CIN, so this works without assuming IDs are unique.
+    """
+    old, new = fingerprinted(old), fingerprinted(new)
+    match_columns = KEY + ["fingerprint"]
+    old_index = pd.MultiIndex.from_frame(old[match_columns])
+    new_index = pd.MultiIndex.from_frame(new[match_columns])
+    old_left = old[~old_index.isin(new_index)]
+    new_left = new[~new_index.isin(old_index)]
+
+    old_counts = old_left.groupby(KEY, dropna=False).size()
+    new_counts = new_left.groupby(KEY, dropna=False).size()
+    paired_keys = old_counts[old_counts == 1].index.intersection(new_counts[new_counts == 1].index)
+    old_paired = pd.MultiIndex.from_frame(old_left[KEY]).isin(paired_keys)
+    new_paired = pd.MultiIndex.from_frame(new_left[KEY]).isin(paired_keys)
+
+    pairs = old_left[old_paired].merge(new_left[new_paired], on=KEY, suffixes=("_old", ""))
+    changes = []
+    for change_type, field in ((PRICE_CHANGED, "Reserve Price"), (DEADLINE_MOVED, "last_date_of_submission")):
+        changed = pairs[differs(pairs[f"{field}_old"], pairs[field])].copy()
+        changed["change_type"] = change_type
+        changed["old_reserve_price"] = changed["Reserve Price_old"]
+        changed["old_last_date"] = changed["last_date_of_submission_old"]
+        changes.append(changed)
+
+    added = new_left[~new_paired].copy()
+    added["change_type"] = NEW
+    changes.append(added)
+
+    withdrawn = old_left[~old_paired].copy()
+    withdrawn["change_type"] = WITHDRAWN
+    withdrawn["old_reserve_price"] = withdrawn["Reserve Price"]
+    withdrawn["old_last_date"] = withdrawn["last_date_of_submission"]
+    withdrawn = withdrawn.drop(columns=["Reserve Price", "last_date_of_submission", "days_until_submission"])
+    changes.append(withdrawn)
+
+    changes = [frame for frame in changes if not frame.empty]
+    result = pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=CHANGE_SCHEMA.names)
+    result["previous_date"] = previous_date
+    for field in CHANGE_SCHEMA.names:
+        if field not in result.columns:
+            result[field] = None
+    return result[CHANGE_SCHEMA.names]
+
+def diff_dates(old_date, new_date):
+    """Changes between any two stored scrape dates."""
+    old = read_day(old_date, columns=SNAPSHOT_COLUMNS)
+    new = read_day(new_date, columns=SNAPSHOT_COLUMNS)
+    return diff_snapshots(old, new, previous_date=old_date)
+
+def change_file(change_date):
+    return os.path.join(CHANGES_DIR, f"change_date={change_date.isoformat()}", "part-0.parquet")
+
+def snapshot_digest(scrape_date):
+    """SHA-256 over the paths and contents of one stored day's partitions."""
+    digest = hashlib.sha256()
+    paths = glob.glob(os.path.join(HISTORY_DIR, "source=*", f"scrape_date={scrape_date.isoformat()}", "*.parquet"))
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, HISTORY_DIR).replace(os.sep, "/").encode("utf-8"))
+        digest.update(file_digest(path).encode("ascii"))
+    return digest.hexdigest()
+
+def logged_snapshots(change_date):
+    """The snapshot digests a change partition was computed from, or None if it is missing or predates them."""
+    target = change_file(change_date)
+    if not os.path.exists(target):
+        return None
+    metadata = pq.read_schema(target).metadata or {}
+    return json.loads(metadata[SNAPSHOTS_KEY]) if SNAPSHOTS_KEY in metadata else None
+
+def write_changes(change_date, changes, snapshots=None):
+    target = change_file(change_date)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    table = pa.Table.from_pandas(changes, schema=CHANGE_SCHEMA, preserve_index=False)
+    if snapshots:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SNAPSHOTS_KEY: json.dumps(snapshots)})
+    pq.write_table(table, target + ".tmp", compression="zstd")
+    os.replace(target + ".tmp", target)
+
+def update_change_log():
+    """Diff every stored day against the previous stored day where the change partition is missing or stale."""
+    dates = stored_dates()
+    digests = {scrape_date.isoformat(): snapshot_digest(scrape_date) for scrape_date in dates}
+    updated = 0
+    for previous_date, change_date in zip(dates, dates[1:]):
+        snapshots = {day: digests[day] for day in (previous_date.isoformat(), change_date.isoformat())}
+        if logged_snapshots(change_date) == snapshots:
+            continue
+        changes = diff_dates(previous_date, change_date)
+        write_changes(change_date, changes, snapshots)
+        counts = changes["change_type"].value_counts().to_dict()
+        logger.info(f"Changes {previous_date} -> {change_date}: {counts}")
+        updated += 1
+    logger.info(f"Change log updated for {updated} days")
+    return updated
+
+def read_changes(start_date=None, end_date=None, change_types=None, sources=None, columns=None):
+    """Read logged changes for a range of change dates, with filters pushed down to Parquet."""
+    if not os.path.isdir(CHANGES_DIR):
+        return pd.DataFrame(columns=columns or ["change_date"] + CHANGE_SCHEMA.names)
+    expression = None
+    for condition in (
+        ds.field("change_date") >= pa.scalar(start_date, pa.date32()) if start_date else None,
+        ds.field("change_date") <= pa.scalar(end_date, pa.date32()) if end_date else None,
+        ds.field("change_type").isin(list(change_types)) if change_types else None,
+        ds.field("Source").isin(list(sources)) if sources else None,
+    ):
+        if condition is not None:
+            expression = condition if expression is None else expression & condition
+    dataset = ds.dataset(CHANGES_DIR, format="parquet", partitioning=PARTITIONING)
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+def summarize(changes):
+    """One-line count of changes by type, e.g. "12 new, 3 withdrawn, 0 price changed, 1 deadline moved"."""
+    counts = changes["change_type"].value_counts()
+    return ", ".join(f"{int(counts.get(t, 0))} {t.replace('_', ' ')}" for t in CHANGE_TYPES)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Day-over-day auction changes.")
+    parser.add_argument("--update", action="store_true", help="Bring the change log up to date")
+    parser.add_argument("--diff", nargs=2, type=date.fromisoformat, metavar=("OLD", "NEW"),
+                        help="Compare two stored scrape dates")
+    parser.add_argument("--output", help="With --diff, write the changes to this CSV file")
+    args = parser.parse_args()
+    if args.update:
+        update_change_log()
+    if args.diff:
+        changes = diff_dates(*args.diff)
+        logger.info(f"{args.diff[0]} -> {args.diff[1]}: {summarize(changes)}")
+        if args.output:
+            changes.to_csv(args.output, index=False)
+    if not (args.update or args.diff):
+        parser.print_help()
@@ -0,0 +1,151 @@
+import csv
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Output directory
+DOWNLOAD_DIR = "auction_exports"
+CHECKPOINT_DIR = os.path.join(DOWNLOAD_DIR, ".checkpoints")
+
+class RowCollector:
+    """In-memory page sink with the same interface as StreamingWriter."""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.fieldnames = None
+        self.rows = []
+        self.seen_ids = set()
+        self.last_page = 0
+
+    def set_fieldnames(self, fieldnames):
+        if self.fieldnames is None:
+            self.fieldnames = list(fieldnames)
+
+    def write_page(self, rows, page=None):
+        for row in rows:
+            row_id = self.key(row) if self.key else None
+            if row_id and row_id in self.seen_ids:
+                continue
+            if row_id:
+                self.seen_ids.add(row_id)
+            self.rows.append(row)
+        if page is not None:
+            self.last_page = page
+
+class StreamingWriter:
+    """Appends rows to the output CSV page by page and checkpoints progress for --resume.
+
+    Rows go to `<output>.partial`, which is renamed to the output file by finish(). After
+    every page the checkpoint records the last completed page, the IDs written so far and
+    the byte offset of the partial file, so a resumed run can truncate a half-written page
+    and continue from the next one.
+    """
+
+    def __init__(self, output_file, key=None, fieldnames=None, resume=False):
+        self.output_file = output_file
+        self.partial_file = output_file + ".partial"
+        self.checkpoint_file = os.path.join(CHECKPOINT_DIR, os.path.basename(output_file) + ".json")
+        self.key = key
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.last_page = 0
+        self.seen_ids = set()
+        self.rows_written = 0
+        self.header_written = False
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+        state = self.load_checkpoint() if resume else None
+        if state:
+            self.fieldnames = state["fieldnames"]
+            self.last_page = state["last_page"]
+            self.seen_ids = set(state["seen_ids"])
+            self.rows_written = state["rows_written"]
+            self.header_written = state["header_written"]
+            self.file = open(self.partial_file, "r+", newline='', encoding="utf-8")
+            self.file.seek(state["offset"])
+            self.file.truncate()
+            logger.info(f"Resuming {self.output_file} after page {self.last_page} ({self.rows_written} rows already written)")
+        else:
+            self.file = open(self.partial_file, "w", newline='', encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if self.fieldnames and not self.header_written:
+            self.write_header()
+
+    def load_checkpoint(self):
+        """Return the saved checkpoint, or None if there is nothing to resume."""
+        if not (os.path.exists(self.checkpoint_file) and os.path.exists(self.partial_file)):
+            logger.info(f"No checkpoint for {self.output_file}; starting from the first page.")
+            return None
+        try:
+            with open(self.checkpoint_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", self.checkpoint_file, e)
+            return None
+
+    def save_checkpoint(self):
+        state = {
+            "last_page": self.last_page,
+            "rows_written": self.rows_written,
+            "offset": self.file.tell(),
+            "fieldnames": self.fieldnames,
+            "header_written": self.header_written,
+            "seen_ids": sorted(self.seen_ids),
+        }
+        temp_file = self.checkpoint_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def write_header(self):
+        self.writer.writerow(self.fieldnames)
+        self.header_written = True
+
+    def set_fieldnames(self, fieldnames):
+        """Set the header once it is known (e.g. from the first scraped table)."""
+        if self.fieldnames is None:
+            self.fieldnames = list(fieldnames)
+            self.write_header()
+
+    def write_page(self, rows, page=None):
+        """Append one page of rows, skipping IDs already written, and checkpoint it."""
+        written = 0
+        for row in rows:
+            row_id = self.key(row) if self.key else None
+            if row_id and row_id in self.seen_ids:
+                continue
+            if row_id:
+                self.seen_ids.add(row_id)
+            if isinstance(row, dict):
+                values = [row.get(field, "") for field in self.fieldnames]
+            else:
+                values = list(row) + [""] * (len(self.fieldnames) - len(row))
+            self.writer.writerow(values)
+            written += 1
+        self.rows_written += written
+        if written < len(rows):
+            logger.info(f"Skipped {len(rows) - written} rows with Auction IDs already written")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if page is not None:
+            self.last_page = page
+        self.save_checkpoint()
+
+    def finish(self):
+        """Move the completed file into place and drop the checkpoint; None if nothing was written."""
+        self.file.close()
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        if not self.rows_written:
+            os.remove(self.partial_file)
+            return None
+        os.replace(self.partial_file, self.output_file)
+        logger.info(f"Data saved to {self.output_file} with {self.rows_written} rows")
+        return self.output_file
+
+    def close(self):
+        """Stop writing but keep the partial file and checkpoint for a later --resume."""
+        if not self.file.closed:
+            self.file.close()
+            logger.info(f"Kept {self.partial_file} and its checkpoint after page {self.last_page}")
@@ -0,0 +1,138 @@
+from datetime import date, datetime
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Output directory
+DOWNLOAD_DIR = "auction_exports"
+
+# Scrape only until a run of pages brings nothing new, then carry the rest forward from the previous export
+INCREMENTAL = os.getenv("INCREMENTAL", "0") == "1"
+STOP_AFTER_STALE_PAGES = int(os.getenv("INCREMENTAL_STOP_AFTER_PAGES", "3"))
+# Rows carried forward this many days in a row without being seen on the site are dropped
+MAX_CARRY_DAYS = int(os.getenv("INCREMENTAL_MAX_CARRY_DAYS", "7"))
+
+def fields_fingerprint(values):
+    """Short hash of a row's key fields."""
+    return hashlib.sha1("\x1f".join(str(v) for v in values).encode("utf-8")).hexdigest()[:16]
+
+def previous_export(prefix, today_str):
+    """Return the newest `<prefix>_YYYYMMDD.csv` dated before today_str, or None."""
+    candidates = []
+    for path in glob.glob(os.path.join(DOWNLOAD_DIR, f"{prefix}_*.csv")):
+        match = re.search(r"_(\d{8})\.csv$", path)
+        if match and match.group(1) < today_str:
+            candidates.append((match.group(1), path))
+    return max(candidates)[1] if candidates else None
+
+def deadline_reader(column, date_format):
+    """deadline_of for carry_forward: row[column] parsed with date_format, or None if it does not parse."""
+    def deadline_of(row):
+        try:
+            return datetime.strptime(row[column].strip(), date_format).date()
+        except (IndexError, KeyError, AttributeError, ValueError):
+            return None
+    return deadline_of
+
+def read_dict_rows(path):
+    """Read a CSV export as a list of dicts."""
+    with open(path, newline='', encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def read_list_rows(path):
+    """Read a CSV export as a list of lists, dropping the header row."""
+    with open(path, newline='', encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+class DeltaIndex:
+    """Known Auction IDs and key-field fingerprints from the previous run of a scraper."""
+
+    def __init__(self, entries, stop_after=STOP_AFTER_STALE_PAGES, carried_file=None):
+        self.entries = entries  # auction_id -> (fingerprint, raw row)
+        self.stop_after = stop_after
+        # auction_id -> ISO date it was first carried forward, kept between runs
+        self.carried_file = carried_file
+        self.stale_pages = 0
+        self.stopped_early = False
+
+    @classmethod
+    def from_previous_export(cls, prefix, today_str, key_of, fingerprint_of, read_rows=read_dict_rows):
+        """Build the index from the newest earlier export, or an empty index if there is none."""
+        carried_file = os.path.join(DOWNLOAD_DIR, f".carried_{prefix}.json")
+        path = previous_export(prefix, today_str)
+        if not path:
+            logger.info(f"No previous {prefix} export found; incremental mode will scrape everything.")
+            return cls({}, carried_file=carried_file)
+        entries = {}
+        for row in read_rows(path):
+            entries[key_of(row)] = (fingerprint_of(row), row)
+        logger.info(f"Loaded {len(entries)} known auctions from {path}")
+        return cls(entries, carried_file=carried_file)
+
+    def is_new_or_changed(self, auction_id, fingerprint):
+        """True if the auction is unknown or its key fields differ from the previous run."""
+        known = self.entries.get(auction_id)
+        return known is None or known[0] != fingerprint
+
+    def observe_page(self, items):
+        """Record a scraped page of (auction_id, fingerprint) pairs; return True once scraping can stop."""
+        fresh = sum(1 for auction_id, fingerprint in items if self.is_new_or_changed(auction_id, fingerprint))
+        logger.info(f"Incremental: {fresh} of {len(items)} rows on this page are new or changed")
+        self.stale_pages = 0 if fresh else self.stale_pages + 1
+        if self.entries and self.stale_pages >= self.stop_after:
+            logger.info(f"Incremental: {self.stale_pages} pages in a row with nothing new. Stopping.")
+            self.stopped_early = True
+        return self.stopped_early
+
+    def load_carried(self):
+        if not self.carried_file or not os.path.exists(self.carried_file):
+            return {}
+        with open(self.carried_file, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_carried(self, carried):
+        if not self.carried_file:
+            return
+        temp_file = self.carried_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(carried, f, indent=0, sort_keys=True)
+        os.replace(temp_file, self.carried_file)
+
+    def carry_forward(self, scraped_ids, today, deadline_of):
+        """Rows of the previous run that were not scraped again, if pagination stopped early.
+
+        Rows whose deadline (deadline_of(row), a date or None) is before today are left out, as
+        are rows carried for MAX_CARRY_DAYS without being seen again, so withdrawn auctions
+        drop out of the export instead of being carried forever.
+        """
+        if not self.stopped_early:
+            # Everything still listed was scraped, so nothing is being carried any more
+            self.save_carried({})
+            return []
+        first_carried = self.load_carried()
+        carried = {}
+        rows = []
+        expired = stale = 0
+        for auction_id, (_, row) in self.entries.items():
+            if auction_id in scraped_ids:
+                continue
+            deadline = deadline_of(row)
+            if deadline is not None and deadline < today:
+                expired += 1
+                continue
+            since = date.fromisoformat(first_carried.get(str(auction_id), today.isoformat()))
+            if (today - since).days >= MAX_CARRY_DAYS:
+                stale += 1
+                continue
+            carried[str(auction_id)] = since.isoformat()
+            rows.append(row)
+        self.save_carried(carried)
+        logger.info(f"Incremental: carrying forward {len(rows)} unchanged rows from the previous run; dropped "
+                    f"{expired} past their deadline and {stale} not seen for {MAX_CARRY_DAYS} days")
+        return rows
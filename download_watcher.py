@@ -0,0 +1,97 @@
+import fnmatch
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not available off Linux; fall back to polling
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+# Output directory
+DOWNLOAD_DIR = "auction_exports"
+
+# Suffixes browsers use while a download is still in progress
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp", ".download")
+POLL_INTERVAL = 0.25
+# A finished file must keep the same size for this long before it is accepted
+STABLE_INTERVAL = 0.5
+
+class DownloadWatcher:
+    """Watches a private per-run download directory for one completed file."""
+
+    def __init__(self, parent_dir=DOWNLOAD_DIR, pattern="*"):
+        self.pattern = pattern
+        os.makedirs(parent_dir, exist_ok=True)
+        # Created next to the final location so the move into place is an atomic rename
+        self.directory = tempfile.mkdtemp(prefix=".download_", dir=parent_dir)
+        self.inotify = None
+        if INotify is not None:
+            try:
+                self.inotify = INotify()
+                self.inotify.add_watch(self.directory, flags.CLOSE_WRITE | flags.MOVED_TO)
+            except OSError as e:
+                logger.warning("inotify unavailable, polling instead: %s", e)
+                self.inotify = None
+        logger.info("Watching download directory %s (%s)", self.directory, "inotify" if self.inotify else "polling")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+    def completed_files(self):
+        """Files in the directory matching the pattern that are not partial downloads."""
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if fnmatch.fnmatch(name, self.pattern) and not name.endswith(PARTIAL_SUFFIXES)
+        ]
+
+    def wait_for_event(self, remaining):
+        """Block until the directory may have changed or the wait times out."""
+        if self.inotify:
+            self.inotify.read(timeout=int(max(remaining, 0) * 1000))
+        else:
+            time.sleep(min(POLL_INTERVAL, max(remaining, 0)))
+
+    def is_stable(self, path):
+        """True if the file exists and its size does not change over STABLE_INTERVAL."""
+        try:
+            size = os.path.getsize(path)
+            time.sleep(STABLE_INTERVAL)
+            return size > 0 and os.path.getsize(path) == size
+        except FileNotFoundError:
+            return False
+
+    def wait_for_file(self, timeout=120):
+        """Return the path of the first completed, size-stable download, or None on timeout."""
+        deadline = time.time() + timeout
+        while True:
+            for path in self.completed_files():
+                if self.is_stable(path):
+                    logger.info("Download complete: %s (%d bytes)", path, os.path.getsize(path))
+                    return path
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                logger.error("No completed download in %s after %d seconds", self.directory, timeout)
+                return None
+            self.wait_for_event(remaining)
+
+    def move_into_place(self, path, destination):
+        """Atomically move a completed download to its final name."""
+        os.replace(path, destination)
+        logger.info("Moved download to %s", destination)
+        return destination
+
+    def cleanup(self):
+        """Close the watch and remove the private download directory."""
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,92 +1,286 @@
 import pandas as pd
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition
-import glob
+from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition, Personalization, Substitution, To
 import os
 import logging
-import base64
 from datetime import datetime
+import pyarrow.dataset as ds
+from history_store import SCHEMA, latest_date, read_day, as_export_frame
+from money import format_rupees, parse_money
+from export_catalog import get_catalog
+from change_feed import read_changes, summarize
+from entity_resolution import deduplicate
+from subscriptions import SUBSCRIPTIONS_FILE, default_subscriptions, describe, load_subscriptions, match_subscriptions
+from alert_state import AlertState, NEW, CHANGED, UNCHANGED
+from attachments import AttachmentBuilder
+from notifier import (SMTP_HOST, WEBHOOK_URL, SENT, SKIPPED, DeliveryLog, Message, Notifier, SendGridChannel,
+                      SMTPChannel, WebhookChannel, idempotency_key)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def send_email_alert(api_key, sender_email, recipient_emails, days_threshold=7):
-    """Send an email alert with upcoming auction deadlines as a CSV attachment."""
+# Only alert on auctions with at least this Reserve Price in rupees (0 = all)
+MIN_RESERVE_PRICE = int(os.getenv("ALERT_MIN_RESERVE_PRICE", "0"))
+# SendGrid API base URL; point it at a local mock (python -m benchmarks.mock_sendgrid) to test without sending
+SENDGRID_HOST = os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+# sendgrid (falling back to SMTP when SMTP_HOST is set) or smtp
+EMAIL_CHANNEL = os.getenv("NOTIFY_EMAIL_CHANNEL", "sendgrid")
+# Auctions listed in the body of each subscriber's email; the rest are only counted
+MAX_LISTED = int(os.getenv("ALERT_MAX_LISTED", "25"))
+# Also list matches already sent on earlier days, below the new and changed ones
+DIGEST = os.getenv("ALERT_DIGEST", "0") == "1"
+
+# SendGrid limits: personalizations per request and substitution bytes per personalization
+MAX_PERSONALIZATIONS = 1000
+MAX_SUBSTITUTION_BYTES = 10000
+# Placeholder in the shared content that each personalization replaces with its own body
+BODY_TAG = "-body-"
+
+def load_upcoming(days_threshold, min_reserve_price=MIN_RESERVE_PRICE):
+    """Auctions of the latest scrape with 0 <= days_until_submission <= days_threshold, or None if there is no data."""
+    sort_columns, ascending = ['days_until_submission', 'Reserve Price'], [True, False]
+    scrape_date = latest_date()
+    if scrape_date is not None:
+        # Only the matching rows of the latest day are decoded
+        days = ds.field("days_until_submission")
+        condition = (days >= 0) & (days <= days_threshold)
+        if min_reserve_price:
+            condition &= ds.field("Reserve Price") >= min_reserve_price
+        df = read_day(scrape_date, columns=SCHEMA.names, where=condition)
+        logger.info("Read %d upcoming auctions for %s from the history store", len(df), scrape_date)
+        # One row per property, however many portals list it
+        df = deduplicate(df)
+        logger.info("%d upcoming auctions after removing cross-source duplicates", len(df))
+        return as_export_frame(df.sort_values(by=sort_columns, ascending=ascending))
+
+    # Latest good combined CSV according to the export catalog
+    latest_csv = get_catalog().latest_path("combined")
+    if not latest_csv:
+        return None
+
+    df = pd.read_csv(latest_csv)
+    if 'days_until_submission' not in df.columns:
+        logger.error("Column 'days_until_submission' not found in the data.")
+        return None
+    df['days_until_submission'] = pd.to_numeric(df['days_until_submission'], errors='coerce')
+    df['Reserve Price'] = parse_money(df['Reserve Price'])[0]
+    upcoming_df = df[(df['days_until_submission'] >= 0) & (df['days_until_submission'] <= days_threshold)]
+    if min_reserve_price:
+        upcoming_df = upcoming_df[upcoming_df['Reserve Price'] >= min_reserve_price]
+    upcoming_df = deduplicate(upcoming_df)
+    return upcoming_df.sort_values(by=sort_columns, ascending=ascending)
+
+def load_latest_changes():
+    """Changes logged for the latest stored scrape date, or None if there are none."""
+    scrape_date = latest_date()
+    if scrape_date is None:
+        return None
+    changes = read_changes(scrape_date, scrape_date)
+    return None if changes.empty else changes.drop(columns=["change_date"])
+
+def sendgrid_attachments(builder):
+    return [
+        Attachment(FileContent(content), FileName(filename), FileType(mime_type), Disposition('attachment'))
+        for filename, mime_type, content in builder.attachments
+    ]
+
+def listing_line(row):
+    """One auction as a line of the email body."""
+    price = pd.to_numeric(row['Reserve Price'], errors='coerce')
+    price = format_rupees(price) if pd.notna(price) else "no reserve price"
+    return (f"- {row['last_date_of_submission']} ({row['days_until_submission']} days) | {row['Bank/Organisation Name']} | "
+            f"{row['City/District/Location']} | {row['Category']} | {price} | {row['Source']} {row['Auction ID']}")
+
+def listing_section(lines, total):
+    more = total - len(lines)
+    return "\n".join(lines) + (f"\n...and {more} more." if more else "")
+
+def personal_body(subscription, delta, changed, earlier, notes):
+    """Plain-text body for one subscriber within SendGrid's substitution size limit.
+
+    Lists the new and changed matches, then either the matches sent on earlier days (with
+    ALERT_DIGEST) or just their count. Digest lines are trimmed first when space runs out.
+    """
+    if delta.empty:
+        header = f"No new or changed auctions matched your alert today ({describe(subscription)})."
+    else:
+        header = f"Found {len(delta)} new or changed auctions matching your alert ({describe(subscription)}).\n\n"
+    lines = [
+        listing_line(row) + (" (deadline or price changed)" if index in changed else "")
+        for index, row in delta.head(MAX_LISTED).iterrows()
+    ]
+    digest = [listing_line(row) for _, row in earlier.head(MAX_LISTED).iterrows()] if DIGEST else []
+    while True:
+        body = header + listing_section(lines, len(delta))
+        if DIGEST and not earlier.empty:
+            body += f"\n\nStill open from earlier alerts ({len(earlier)}):\n" + listing_section(digest, len(earlier))
+        elif not earlier.empty:
+            body += f"\n\n{len(earlier)} auctions from earlier alerts are still open."
+        body += "".join(notes)
+        if len(body.encode('utf-8')) <= MAX_SUBSTITUTION_BYTES or not (lines or digest):
+            return body
+        (digest or lines).pop()
+
+def personalization(subscription, subject, body):
+    entry = Personalization()
+    entry.add_to(To(subscription['email']))
+    entry.subject = subject
+    entry.add_substitution(Substitution(BODY_TAG, body))
+    return entry
+
+def alert_channels(api_key):
+    channels = [WebhookChannel()] if WEBHOOK_URL else []
+    if EMAIL_CHANNEL == "sendgrid":
+        channels.append(SendGridChannel(api_key, SENDGRID_HOST))
+    if SMTP_HOST:
+        channels.append(SMTPChannel())
+    return channels
+
+def email_messages(sender_email, alerts, builder, today):
+    """Notifier messages for (subscription, subject, body) alerts.
+
+    With the sendgrid channel every MAX_PERSONALIZATIONS subscribers share one request, and
+    each subscriber gets a separate SMTP message as fallback if that request fails for good.
+    """
+    def smtp_message(subscription, subject, body):
+        key = idempotency_key("smtp", today, subscription['email'], subject, body)
+        payload = {"sender": sender_email, "recipient": subscription['email'], "subject": subject, "body": body,
+                   "attachments": builder.attachments}
+        return Message("smtp", key, payload, [subscription['email']])
+
+    if EMAIL_CHANNEL == "smtp":
+        return [smtp_message(*alert) for alert in alerts]
+    attachments = sendgrid_attachments(builder)
+    messages = []
+    for start in range(0, len(alerts), MAX_PERSONALIZATIONS):
+        batch = alerts[start:start + MAX_PERSONALIZATIONS]
+        mail = Mail(
+            from_email=sender_email,
+            subject=f"Auction Alerts - Upcoming Deadlines ({today})",
+            plain_text_content=BODY_TAG
+        )
+        for subscription, subject, body in batch:
+            mail.add_personalization(personalization(subscription, subject, body))
+        if attachments:
+            mail.attachment = attachments
+        key = idempotency_key("sendgrid", today, *(f"{s['email']}\n{subject}\n{body}" for s, subject, body in batch))
+        fallback = [smtp_message(*alert) for alert in batch] if SMTP_HOST else []
+        messages.append(Message("sendgrid", key, mail, [subscription['email'] for subscription, _, _ in batch], fallback))
+    return messages
+
+def webhook_message(today, recipients, classified, changes):
+    """A chat-style summary of the run for ALERT_WEBHOOK_URL."""
+    new, changed = (sum(len(groups[kind]) for groups in classified.values()) for kind in (NEW, CHANGED))
+    text = f"Auction alerts {today}: {len(recipients)} subscribers alerted about {new} new and {changed} changed matches."
+    if changes is not None:
+        text += f" Changes since {changes['previous_date'].iloc[0]}: {summarize(changes)}."
+    payload = {"text": text, "date": today, "subscribers": len(recipients), "new": new, "changed": changed}
+    return Message("webhook", idempotency_key("webhook", text), payload)
+
+def send_email_alert(api_key, sender_email, recipient_emails, subscriptions=None):
+    """Send every subscriber the upcoming auctions matching their filters, in batched SendGrid requests.
+
+    Subscriptions come from SUBSCRIPTIONS_FILE; without it every address in recipient_emails gets
+    the deadline window of ALERT_DAYS. Subscribers with the same new and changed auctions share a
+    message with those auctions attached as CSV; each is a personalization with their own subject
+    and body, so nobody sees the other recipients. Auctions already sent
+    to a subscriber are left out unless their deadline or price changed (see alert_state.py);
+    subscribers without new or changed auctions get no email unless ALERT_DIGEST is set.
+    Delivery, retries and the SMTP and webhook channels are handled by notifier.py.
+    """
     try:
         # Validate inputs
-        if not api_key or not sender_email or not recipient_emails:
-            logger.error("Missing required environment variables: SENDGRID_API_KEY, SENDER_EMAIL, or RECIPIENT_EMAILS")
+        if not sender_email or (EMAIL_CHANNEL == "sendgrid" and not api_key):
+            logger.error("Missing required environment variables: SENDGRID_API_KEY or SENDER_EMAIL")
             return False
-
-        # Ensure recipient_emails is a list
-        if isinstance(recipient_emails, str):
-            recipient_emails = [email.strip() for email in recipient_emails.split(',') if email.strip()]
-
-        # Basic validation
-        if not all('@' in email for email in recipient_emails):
-            logger.error("Invalid email address in recipient list: %s", recipient_emails)
+        if EMAIL_CHANNEL == "smtp" and not SMTP_HOST:
+            logger.error("NOTIFY_EMAIL_CHANNEL is smtp but SMTP_HOST is not set")
+            return False
+        if subscriptions is None:
+            subscriptions = load_subscriptions()
+        if subscriptions is None:
+            if not recipient_emails:
+                logger.error(f"No {SUBSCRIPTIONS_FILE} and no RECIPIENT_EMAILS to alert")
+                return False
+            subscriptions = default_subscriptions(recipient_emails, MIN_RESERVE_PRICE)
+        if not subscriptions:
+            logger.error("No subscriptions to alert")
             return False
 
-        # Find the latest combined CSV file
-        csv_files = glob.glob("auction_exports/combined_auctions_*.csv")
-        if not csv_files:
+        # One read covering every subscriber's deadline window and price floor
+        days_threshold = max(subscription['max_days'] for subscription in subscriptions)
+        min_reserve_price = min(subscription.get('min_price') or 0 for subscription in subscriptions)
+        upcoming_df = load_upcoming(days_threshold, min_reserve_price)
+        if upcoming_df is None:
             logger.error("No combined auction data found for email.")
             return False
+        upcoming_df = upcoming_df.reset_index(drop=True)
+        matches = match_subscriptions(upcoming_df, subscriptions)
 
-        latest_csv = max(csv_files, key=os.path.getctime)
-        df = pd.read_csv(latest_csv)
+        # Only auctions not sent to the subscriber before, or whose deadline or price changed since
+        state = AlertState()
+        try:
+            state.prune()
+            classified = state.classify(upcoming_df, matches)
+            deltas = {email: sorted(groups[NEW] + groups[CHANGED]) for email, groups in classified.items()}
+            recipients = [s for s in subscriptions if deltas[s['email']] or (DIGEST and matches[s['email']].size)]
+            logger.info("%d of %d subscribers have new or changed auctions (%d new, %d changed, %d already sent)",
+                        sum(bool(rows) for rows in deltas.values()), len(subscriptions),
+                        *(sum(len(groups[kind]) for groups in classified.values()) for kind in (NEW, CHANGED, UNCHANGED)))
 
-        # Filter for auctions with 0 <= days_until_submission <= threshold
-        if 'days_until_submission' in df.columns:
-            df['days_until_submission'] = pd.to_numeric(df['days_until_submission'], errors='coerce')
-            upcoming_df = df[(df['days_until_submission'] >= 0) & (df['days_until_submission'] <= days_threshold)]
-            upcoming_df = upcoming_df.sort_values(by='days_until_submission')
-        else:
-            logger.error("Column 'days_until_submission' not found in the data.")
-            return False
+            # What changed since the previous scrape, attached to every message
+            shared = AttachmentBuilder()
+            shared_notes = []
+            changes = load_latest_changes()
+            if changes is not None:
+                shared_notes.append(f"\n\nChanges since {changes['previous_date'].iloc[0]}: {summarize(changes)}.")
+                shared_notes.append("\n" + shared.add(changes, 'auction_changes', label="The changed auctions"))
 
-        # Email content
-        subject = f"Auction Alerts - Upcoming Deadlines ({datetime.now().strftime('%Y-%m-%d')})"
-        if upcoming_df.empty:
-            body = "No auctions with submission deadlines between 0 and 7 days. No CSV file attached."
-            attachment = None
-        else:
-            body = f"Found {len(upcoming_df)} auctions with submission deadlines between 0 and 7 days.\n\n"
-            body += "Full details are attached in the CSV file."
-
-            # Save to temp file
-            temp_csv = "upcoming_auctions.csv"
-            upcoming_df.to_csv(temp_csv, index=False)
-
-            with open(temp_csv, 'rb') as f:
-                data = f.read()
-                encoded_file = base64.b64encode(data).decode()
-
-            attachment = Attachment(
-                FileContent(encoded_file),
-                FileName('upcoming_auctions.csv'),
-                FileType('text/csv'),
-                Disposition('attachment')
-            )
-
-            os.remove(temp_csv)
-
-        # Create and send email
-        message = Mail(
-            from_email=sender_email,
-            to_emails=recipient_emails,
-            subject=subject,
-            plain_text_content=body
-        )
+            # Attachments are shared by every personalization of a request, so subscribers with
+            # the same new and changed auctions share messages that attach exactly those
+            delta_groups = {}
+            for subscription in recipients:
+                delta_groups.setdefault(tuple(deltas[subscription['email']]), []).append(subscription)
+            logger.info("%d subscribers to alert in %d groups with the same new and changed auctions",
+                        len(recipients), len(delta_groups))
 
-        if attachment:
-            message.attachment = attachment
+            today = datetime.now().strftime('%Y-%m-%d')
+            messages = []
+            for rows, members in delta_groups.items():
+                builder = shared.copy()
+                notes = ["\n\n" + builder.add(upcoming_df.iloc[list(rows)], 'upcoming_auctions')] if rows else []
+                notes += shared_notes
+                alerts = []
+                for subscription in members:
+                    groups = classified[subscription['email']]
+                    delta = upcoming_df.iloc[list(rows)]
+                    earlier = upcoming_df.iloc[groups[UNCHANGED]]
+                    subject = f"Auction Alerts - {len(delta)} new or changed auctions ({today})"
+                    alerts.append((subscription, subject, personal_body(subscription, delta, set(groups[CHANGED]), earlier, notes)))
+                messages += email_messages(sender_email, alerts, builder, today)
+            if WEBHOOK_URL and recipients:
+                messages.append(webhook_message(today, recipients, classified, changes))
 
-        sg = SendGridAPIClient(api_key)
-        response = sg.send(message)
-        logger.info("Email sent successfully to %s. Status code: %s", recipient_emails, response.status_code)
-        return True
+            log = DeliveryLog()
+            try:
+                log.prune()
+                records = Notifier(alert_channels(api_key), log).send(messages)
+            finally:
+                log.close()
+            # Only what was actually delivered is remembered; a skipped key was delivered by an earlier run
+            delivered = {email for record in records if record['status'] in (SENT, SKIPPED) for email in record['recipients']}
+            state.record(upcoming_df, {email: matches[email] for email in delivered})
+            if not recipients:
+                logger.info("No new or changed auctions for any subscriber; nothing sent.")
+            # Subscribers who got no email still matched their earlier auctions today
+            alerted = {subscription['email'] for subscription in recipients}
+            state.record(upcoming_df, {email: rows for email, rows in matches.items() if email not in alerted})
+        finally:
+            state.close()
+        undelivered = len(alerted - delivered)
+        if undelivered:
+            logger.error("Alerts to %d of %d subscribers could not be delivered", undelivered, len(alerted))
+        return not undelivered
 
     except Exception as e:
         logger.error("Failed to send email: %s", e)
@@ -0,0 +1,225 @@
+"""Cross-source duplicate detection: the same property listed on several portals.
+
+Each row gets blocking keys built from its normalized bank name, location parts and reserve
+price. Candidate pairs are only formed inside a block, between rows of different sources, and
+blocks larger than MAX_BLOCK_SIZE are skipped, so the work grows linearly with the row count.
+Candidates are scored on bank, location, price and deadline similarity; pairs scoring at least
+MATCH_THRESHOLD are merged into clusters that share a cluster_id.
+
+    python entity_resolution.py --date 2025-06-30 --output deduplicated.csv
+"""
+from datetime import date
+from difflib import SequenceMatcher
+import argparse
+import hashlib
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Candidate pairs scoring at least this (0-1) are treated as the same property
+MATCH_THRESHOLD = float(os.getenv("DEDUP_MATCH_THRESHOLD", "0.85"))
+# Blocks with more rows than this are too unspecific to compare and are skipped
+MAX_BLOCK_SIZE = int(os.getenv("DEDUP_MAX_BLOCK_SIZE", "50"))
+# Albion lists the auction date and bank_e the bid deadline, a few days apart for one auction
+DATE_TOLERANCE_DAYS = 5
+
+WEIGHTS = {"bank": 0.3, "location": 0.3, "price": 0.2, "date": 0.2}
+
+# Words dropped from bank names before comparing, and common abbreviations spelled out
+BANK_STOPWORDS = r"\b(?:the|ltd|limited|pvt|private)\b"
+BANK_ALIASES = {
+    "sbi": "state bank of india",
+    "bob": "bank of baroda",
+    "boi": "bank of india",
+    "pnb": "punjab national bank",
+    "iob": "indian overseas bank",
+    "ubi": "union bank of india",
+}
+
+# Rows are blocked on each of these key combinations in turn
+BLOCKINGS = [
+    ["price", "bank_key"],
+    ["price", "location_key"],
+    ["bank_key", "location_key"],
+]
+
+# Filled-in fields decide which listing of a cluster represents it in the deduplicated view
+DETAIL_COLUMNS = ["Bank/Organisation Name", "City/District/Location", "last_date_of_submission",
+                  "Reserve Price", "EMD", "Category"]
+
+def normalize_text(values):
+    """Lowercase, with everything but letters and digits turned into single spaces; "" and "-" become <NA>."""
+    text = values.astype("string").str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+    return text.mask(text.isin(["", "nan"]))
+
+def normalize_bank(values):
+    text = normalize_text(values.astype("string").str.replace("&", " and ", regex=False))
+    text = text.str.replace(BANK_STOPWORDS, " ", regex=True).str.replace(r"\s+", " ", regex=True).str.strip()
+    return text.replace(BANK_ALIASES).mask(text == "")
+
+def location_parts(values):
+    """Comma-separated parts of a location ("Masuda, Ajmer, Rajasthan"), each normalized."""
+    parts = values.astype("string").str.split(",").explode()
+    parts = normalize_text(parts)
+    return parts.dropna()
+
+def blocking_keys(df):
+    """One row per (row, location part) with the price, bank and location blocking keys."""
+    keys = pd.DataFrame({
+        "row": range(len(df)),
+        "Source": df["Source"].to_numpy(),
+        "price": pd.to_numeric(df["Reserve Price"], errors="coerce").astype("Int64").to_numpy(),
+        "bank_key": normalize_bank(df["Bank/Organisation Name"]).str.replace(" ", "", regex=False).to_numpy(),
+    })
+    parts = location_parts(pd.Series(df["City/District/Location"].to_numpy()))
+    locations = pd.DataFrame({"row": parts.index, "location_key": parts.to_numpy()})
+    return keys.merge(locations, on="row", how="left")
+
+def block_pairs(keys, key_columns):
+    """Pairs of rows from different sources that share every key column."""
+    blocks = keys[["row", "Source"] + key_columns].dropna().drop_duplicates()
+    sizes = blocks.groupby(key_columns)["row"].transform("size")
+    blocks = blocks[(sizes > 1) & (sizes <= MAX_BLOCK_SIZE)]
+    pairs = blocks.merge(blocks, on=key_columns, suffixes=("_a", "_b"))
+    pairs = pairs[(pairs["row_a"] < pairs["row_b"]) & (pairs["Source_a"] != pairs["Source_b"])]
+    return pairs[["row_a", "row_b"]]
+
+def candidate_pairs(df):
+    keys = blocking_keys(df)
+    pairs = pd.concat([block_pairs(keys, columns) for columns in BLOCKINGS], ignore_index=True)
+    return pairs.drop_duplicates().reset_index(drop=True)
+
+def submission_dates(df):
+    """last_date_of_submission as datetime64, whether it holds dates, timestamps or DD-MM-YYYY text."""
+    values = pd.Series(df["last_date_of_submission"].to_numpy())
+    return pd.to_datetime(values, format="mixed", dayfirst=True, errors="coerce")
+
+def similarity(a, b):
+    return SequenceMatcher(None, a, b).ratio() if isinstance(a, str) and isinstance(b, str) else 0.0
+
+def score_pairs(df, pairs):
+    """Weighted 0-1 similarity of each candidate pair; missing prices or dates count as half a match."""
+    a, b = pairs["row_a"].to_numpy(), pairs["row_b"].to_numpy()
+    banks = normalize_bank(df["Bank/Organisation Name"]).to_numpy()
+    bank_score = pd.Series([similarity(x, y) for x, y in zip(banks[a], banks[b])], dtype=float)
+
+    # Only the rows that are part of a candidate pair are split into location parts
+    involved = np.unique(np.concatenate([a, b]))
+    locations = pd.Series(df["City/District/Location"].to_numpy()[involved], index=involved)
+    parts = location_parts(locations).groupby(level=0).agg(list).to_dict()
+    location_score = pd.Series([
+        max((similarity(x, y) for x in parts.get(row_a, []) for y in parts.get(row_b, [])), default=0.0)
+        for row_a, row_b in zip(a, b)
+    ], dtype=float)
+
+    prices = pd.to_numeric(df["Reserve Price"], errors="coerce").astype(float).to_numpy()
+    price_a, price_b = pd.Series(prices[a]), pd.Series(prices[b])
+    relative = (price_a - price_b).abs() / pd.concat([price_a, price_b], axis=1).max(axis=1)
+    price_score = (1 - relative * 10).clip(0, 1).fillna(0.5)
+
+    dates = submission_dates(df)
+    apart = (pd.Series(dates.to_numpy()[a]) - pd.Series(dates.to_numpy()[b])).dt.days.abs()
+    date_score = (apart <= DATE_TOLERANCE_DAYS).astype(float).mask(apart.isna(), 0.5)
+
+    return (WEIGHTS["bank"] * bank_score + WEIGHTS["location"] * location_score
+            + WEIGHTS["price"] * price_score + WEIGHTS["date"] * date_score)
+
+def best_matches(df, pairs, scores):
+    """Matching pairs, keeping for each row only its best match in every other source.
+
+    A bank often auctions several lots at one price in one town; matching greedily one-to-one
+    pairs each lot with one listing instead of chaining all of them into a single cluster.
+    """
+    matched = (scores >= MATCH_THRESHOLD).to_numpy()
+    matches = pairs[matched].assign(score=scores[matched].to_numpy()).sort_values("score", ascending=False, kind="stable")
+    sources = df["Source"].to_numpy()
+    taken = set()
+    keep = []
+    for index, row_a, row_b in zip(matches.index, matches["row_a"], matches["row_b"]):
+        if (row_a, sources[row_b]) in taken or (row_b, sources[row_a]) in taken:
+            continue
+        taken.update([(row_a, sources[row_b]), (row_b, sources[row_a])])
+        keep.append(index)
+    return matches.loc[keep]
+
+def find_root(parents, row):
+    while parents[row] != row:
+        parents[row] = parents[parents[row]]
+        row = parents[row]
+    return row
+
+def assign_clusters(df):
+    """cluster_id for every row of a combined frame; rows of one property on several portals share it.
+
+    The ID is a hash of the cluster's first member (by source, Auction ID, price, deadline and
+    position among identical rows), so it stays the same from day to day while the listings do.
+    Repeated rows within one source are not merged; IBBI lists several notices under one CIN.
+    """
+    start = time.time()
+    pairs = candidate_pairs(df)
+    matches = best_matches(df, pairs, score_pairs(df, pairs))
+    parents = list(range(len(df)))
+    for row_a, row_b in zip(matches["row_a"], matches["row_b"]):
+        root_a, root_b = find_root(parents, row_a), find_root(parents, row_b)
+        if root_a != root_b:
+            parents[max(root_a, root_b)] = min(root_a, root_b)
+    roots = pd.Series([find_root(parents, row) for row in range(len(df))])
+
+    first_member = pd.Series(
+        df["Source"].astype(str).to_numpy() + "|" + df["Auction ID"].astype(str).to_numpy() + "|"
+        + df["Reserve Price"].astype(str).to_numpy() + "|" + submission_dates(df).dt.strftime("%Y-%m-%d").fillna("").to_numpy()
+    )
+    first_member = first_member + "|" + first_member.groupby(first_member).cumcount().astype(str)
+    clustered = (roots != pd.RangeIndex(len(df))) | roots.duplicated(keep=False)
+    first_member[clustered] = first_member[clustered].groupby(roots[clustered]).transform("min")
+    cluster_ids = first_member.map(lambda key: hashlib.sha1(key.encode("utf-8")).hexdigest()[:12])
+    duplicates = len(df) - roots.nunique()
+    logger.info(f"Entity resolution: {len(pairs)} candidate pairs, {len(matches)} matches, "
+                f"{duplicates} cross-source duplicates in {len(df)} rows ({time.time() - start:.2f}s)")
+    return cluster_ids.to_numpy()
+
+def deduplicate(df):
+    """One row per cluster_id and scrape day: the most complete listing, with the sources it appears on in `listed_on`.
+
+    cluster_id stays the same from day to day, so frames spanning several scrape dates keep one
+    row per day. Works on typed frames and on export frames ("-" for missing). Rows without a
+    cluster_id are kept.
+    """
+    if "cluster_id" not in df.columns:
+        return df
+    group = df["cluster_id"].astype(str)
+    if "scrape_date" in df.columns:
+        group = df["scrape_date"].astype(str) + "|" + group
+    details = df[[column for column in DETAIL_COLUMNS if column in df.columns]]
+    filled = (details.notna() & details.astype(str).ne("-")).sum(axis=1)
+    clustered = df["cluster_id"].notna() & df["cluster_id"].astype(str).ne("-")
+    ranked = filled[clustered].sort_values(ascending=False, kind="stable").index
+    keep = ranked[~group[ranked].duplicated()].union(df.index[~clustered])
+    # Only clusters listed more than once that day need their sources joined
+    shared = clustered & group.duplicated(keep=False)
+    listed_on = df.loc[shared, "Source"].groupby(group[shared]).agg(lambda sources: ", ".join(sorted(set(sources))))
+    result = df.loc[df.index.isin(keep)].copy()
+    result["listed_on"] = group[result.index].map(listed_on).fillna(result["Source"])
+    return result
+
+if __name__ == "__main__":
+    from history_store import SCHEMA, as_export_frame, latest_date, read_day
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Deduplicated view of one stored scrape date.")
+    parser.add_argument("--date", type=date.fromisoformat, help="Scrape date (default: latest stored)")
+    parser.add_argument("--output", help="Write the deduplicated rows to this CSV file")
+    args = parser.parse_args()
+    scrape_date = args.date or latest_date()
+    if scrape_date is None:
+        parser.error("The history store is empty")
+    df = read_day(scrape_date, columns=SCHEMA.names)
+    if df["cluster_id"].isna().all():
+        df["cluster_id"] = assign_clusters(df)
+    view = deduplicate(df)
+    logger.info(f"{scrape_date}: {len(df)} listings, {len(view)} after removing cross-source duplicates")
+    if args.output:
+        as_export_frame(view).to_csv(args.output, index=False)
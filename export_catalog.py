@@ -0,0 +1,217 @@
+"""Manifest of the files in auction_exports/, recorded as they are written.
+
+auction_exports/catalog.json maps "<source>:<YYYY-MM-DD>" to the export's path, row count,
+content hash, schema version and status, plus the key of each source's latest good export.
+Readers look exports up here instead of scanning the directory and trusting file ctimes,
+which are reset by every git checkout.
+
+    python export_catalog.py --rebuild    # re-register every export already in auction_exports/
+"""
+from contextlib import contextmanager
+from datetime import date, datetime
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_DIR = "auction_exports"
+CATALOG_FILE = os.path.join(DOWNLOAD_DIR, "catalog.json")
+
+# Export statuses; only "ok" exports are returned as latest
+STATUS_OK = "ok"
+STATUS_EMPTY = "empty"
+STATUS_FAILED = "failed"
+
+EXPORT_NAME = re.compile(r"^(?P<source>.+)_auctions_(?P<date>\d{8})\.(?P<ext>csv|xls)$")
+
+def export_date(path):
+    """Scrape date encoded in an export filename such as combined_auctions_20250630.csv."""
+    match = re.search(r"_(\d{8})\.\w+$", os.path.basename(path))
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+def file_digest(path):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def delimiter_of(path):
+    # The IBBI .xls export is really tab-separated text
+    return "\t" if path.endswith(".xls") else ","
+
+def header_version(path):
+    """Short hash of an export's header row, so column changes show up as a new schema version."""
+    with open(path, newline='', encoding="utf-8", errors="replace") as f:
+        header = next(csv.reader(f, delimiter=delimiter_of(path)), [])
+    return hashlib.sha1("\x1f".join(header).encode("utf-8")).hexdigest()[:12]
+
+def count_rows(path):
+    """Number of data rows in an export, not counting the header."""
+    with open(path, newline='', encoding="utf-8", errors="replace") as f:
+        return max(sum(1 for _ in csv.reader(f, delimiter=delimiter_of(path))) - 1, 0)
+
+class ExportCatalog:
+    """Thread- and process-safe JSON manifest of exports with latest-good and by-date lookups."""
+
+    def __init__(self, path=CATALOG_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.exports = {}
+        self.latest_keys = {}
+        self.loaded_mtime = None
+
+    @contextmanager
+    def process_lock(self):
+        """Exclusive flock on <catalog>.lock, so scrapers and backfill workers in other processes
+        cannot interleave their read-modify-write cycles with ours."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def load(self, force=False):
+        """(Re)read the manifest if it changed on disk; build it from the directory if it is missing."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            if self.loaded_mtime is None:
+                self.rebuild()
+            return
+        if mtime == self.loaded_mtime and not force:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Rebuilding unreadable catalog %s: %s", self.path, e)
+            self.rebuild()
+            return
+        self.exports = data.get("exports", {})
+        self.latest_keys = data.get("latest", {})
+        self.loaded_mtime = mtime
+
+    def save(self):
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"latest": self.latest_keys, "exports": self.exports}, f, indent=1, sort_keys=True)
+        os.replace(temp_file, self.path)
+        self.loaded_mtime = os.stat(self.path).st_mtime
+
+    def add(self, entry):
+        key = f"{entry['source']}:{entry['scrape_date']}"
+        self.exports[key] = entry
+        if entry["status"] == STATUS_OK:
+            current = self.exports.get(self.latest_keys.get(entry["source"]))
+            if current is None or current["scrape_date"] <= entry["scrape_date"]:
+                self.latest_keys[entry["source"]] = key
+
+    def record(self, source, path, rows=None, status=STATUS_OK, schema_version=None, scrape_date=None):
+        """Register an export (or a failed/empty run with path None) and return its entry."""
+        scrape_date = scrape_date or (export_date(path) if path else None) or date.today()
+        entry = {
+            "source": source,
+            "scrape_date": scrape_date.isoformat(),
+            "path": path,
+            "rows": rows if rows is not None or not path else count_rows(path),
+            "sha256": file_digest(path) if path else None,
+            "schema_version": schema_version or (header_version(path) if path else None),
+            "status": status,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        # Another process may have saved within the same mtime tick, so always re-read under the lock
+        with self.lock, self.process_lock():
+            self.load(force=True)
+            previous = self.exports.get(f"{source}:{entry['scrape_date']}")
+            if status != STATUS_OK and previous and previous["status"] == STATUS_OK:
+                # A failed rerun must not hide the good export already written for that day
+                logger.info(f"Keeping good {source} export for {entry['scrape_date']} over {status} rerun")
+                return previous
+            self.add(entry)
+            self.save()
+        logger.info(f"Catalogued {source} export for {entry['scrape_date']}: {path} ({entry['rows']} rows, {status})")
+        return entry
+
+    def latest(self, source):
+        """Entry of the newest good export of a source whose file still exists, or None."""
+        with self.lock:
+            self.load()
+            entry = self.exports.get(self.latest_keys.get(source))
+            if entry and os.path.exists(entry["path"]):
+                return entry
+            # The indexed file is gone; fall back to the newest remaining good export
+            candidates = [
+                e for e in self.exports.values()
+                if e["source"] == source and e["status"] == STATUS_OK and e["path"] and os.path.exists(e["path"])
+            ]
+            return max(candidates, key=lambda e: e["scrape_date"]) if candidates else None
+
+    def for_date(self, source, scrape_date):
+        """Entry of a source's export for one scrape date, or None."""
+        with self.lock:
+            self.load()
+            return self.exports.get(f"{source}:{scrape_date.isoformat()}")
+
+    def latest_path(self, source):
+        entry = self.latest(source)
+        return entry["path"] if entry else None
+
+    def rebuild(self, directory=DOWNLOAD_DIR):
+        """Register every dated export in the directory; the one full scan the catalog needs."""
+        self.exports = {}
+        self.latest_keys = {}
+        for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            match = EXPORT_NAME.match(filename)
+            if not match:
+                continue
+            path = os.path.join(directory, filename)
+            rows = count_rows(path)
+            self.add({
+                "source": match.group("source"),
+                "scrape_date": export_date(path).isoformat(),
+                "path": path,
+                "rows": rows,
+                "sha256": file_digest(path),
+                "schema_version": header_version(path),
+                "status": STATUS_OK if rows else STATUS_EMPTY,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            })
+        if os.path.isdir(os.path.dirname(self.path) or "."):
+            self.save()
+        logger.info(f"Catalog rebuilt with {len(self.exports)} exports from {directory}")
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """Return the process-wide export catalog."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ExportCatalog()
+        return _catalog
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Maintain the auction export catalog.")
+    parser.add_argument("--rebuild", action="store_true", help="Re-register every export in auction_exports/")
+    args = parser.parse_args()
+    if args.rebuild:
+        catalog = get_catalog()
+        with catalog.lock, catalog.process_lock():
+            catalog.rebuild()
+    else:
+        parser.print_help()
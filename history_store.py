@@ -0,0 +1,169 @@
+"""Parquet history of the combined auction data, partitioned by source and scrape date.
+
+Layout: auction_history/source=<source>/scrape_date=<YYYY-MM-DD>/part-0.parquet
+
+    python history_store.py --backfill    # import every combined_auctions_YYYYMMDD.csv not yet stored
+"""
+from datetime import date
+import argparse
+import glob
+import logging
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from money import parse_money
+from export_catalog import export_date
+from entity_resolution import assign_clusters
+from source_schemas import SOURCE_SCHEMAS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", "auction_history")
+EXPORT_DIR = "auction_exports"
+
+# Source column value -> partition name, the source's key in the registry
+SOURCE_PARTITIONS = {schema["label"]: name for name, schema in SOURCE_SCHEMAS.items()}
+
+SCHEMA = pa.schema([
+    ("Auction ID", pa.string()),
+    ("Bank/Organisation Name", pa.string()),
+    ("City/District/Location", pa.string()),
+    ("last_date_of_submission", pa.date32()),
+    ("Reserve Price", pa.int64()),
+    ("EMD", pa.int64()),
+    ("Category", pa.string()),
+    ("Source", pa.string()),
+    ("days_until_submission", pa.int32()),
+    ("cluster_id", pa.string()),
+])
+TEXT_COLUMNS = [field.name for field in SCHEMA if field.type == pa.string()]
+# Whole rupees; older combined CSVs still hold the sources' raw strings
+MONEY_COLUMNS = ["Reserve Price", "EMD"]
+
+PARTITIONING = ds.partitioning(pa.schema([("source", pa.string()), ("scrape_date", pa.date32())]), flavor="hive")
+
+def to_table(df):
+    """Convert a combined frame (dates as DD-MM-YYYY, "-" for missing) into a typed Arrow table."""
+    df = df.copy()
+    for column in TEXT_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column].astype("string").str.strip()
+        df[column] = values.mask(values.isin(["", "-", "nan"]))
+    for column in MONEY_COLUMNS:
+        df[column] = parse_money(df[column])[0]
+    df["last_date_of_submission"] = pd.to_datetime(
+        df["last_date_of_submission"], format="%d-%m-%Y", errors="coerce"
+    ).dt.date
+    df["days_until_submission"] = pd.to_numeric(df["days_until_submission"], errors="coerce").astype("Int32")
+    if "cluster_id" not in df.columns:
+        # Combined CSVs written before entity resolution get their clusters on import
+        df["cluster_id"] = assign_clusters(df)
+    return pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+def as_export_frame(df):
+    """Format a frame read from the store like the combined CSV (DD-MM-YYYY dates, "-" for missing)."""
+    df = df.copy()
+    if "last_date_of_submission" in df.columns:
+        df["last_date_of_submission"] = pd.to_datetime(df["last_date_of_submission"]).dt.strftime("%d-%m-%Y")
+    for column in df.columns:
+        if column in SCHEMA.names:
+            df[column] = df[column].astype(object).where(df[column].notna(), "-")
+    return df
+
+def partition_dir(source, scrape_date):
+    return os.path.join(HISTORY_DIR, f"source={source}", f"scrape_date={scrape_date.isoformat()}")
+
+def write_day(df, scrape_date):
+    """Store one day's combined frame, replacing any partitions already written for that day."""
+    table = to_table(df)
+    sources = table.column("Source").to_pandas()
+    for label, source in SOURCE_PARTITIONS.items():
+        mask = (sources == label).to_numpy()
+        target = partition_dir(source, scrape_date)
+        if not mask.any():
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            continue
+        os.makedirs(target, exist_ok=True)
+        temp_file = os.path.join(target, "part-0.parquet.tmp")
+        pq.write_table(table.filter(pa.array(mask)), temp_file, compression="zstd")
+        os.replace(temp_file, os.path.join(target, "part-0.parquet"))
+    unknown = sorted(set(sources.dropna()) - set(SOURCE_PARTITIONS))
+    if unknown:
+        logger.warning(f"Not stored: rows from unknown sources {unknown}")
+    logger.info(f"Stored {table.num_rows} rows for {scrape_date} in {HISTORY_DIR}")
+
+def dataset():
+    # Columns added to SCHEMA later read as nulls from older partitions
+    schema = pa.unify_schemas([SCHEMA, PARTITIONING.schema])
+    return ds.dataset(HISTORY_DIR, format="parquet", partitioning=PARTITIONING, schema=schema)
+
+def stored_dates():
+    """Sorted scrape dates that have at least one partition in the store."""
+    dates = set()
+    for path in glob.glob(os.path.join(HISTORY_DIR, "source=*", "scrape_date=*", "*.parquet")):
+        dates.add(date.fromisoformat(os.path.basename(os.path.dirname(path)).split("=", 1)[1]))
+    return sorted(dates)
+
+def latest_date():
+    dates = stored_dates()
+    return dates[-1] if dates else None
+
+def read_history(start_date=None, end_date=None, columns=None, sources=None, where=None):
+    """Read rows scraped between start_date and end_date (inclusive) as a DataFrame.
+
+    Only the requested columns are decoded. The date range, sources (partition names such as
+    "albion") and `where` (a pyarrow.dataset expression on the columns, e.g.
+    ds.field("days_until_submission") <= 7) are pushed down to skip partitions and row groups.
+    The scrape_date and source partition columns can be requested like any other column.
+    """
+    if not os.path.isdir(HISTORY_DIR):
+        return pd.DataFrame(columns=columns or SCHEMA.names)
+    expression = None
+    for condition in (
+        ds.field("scrape_date") >= pa.scalar(start_date, pa.date32()) if start_date else None,
+        ds.field("scrape_date") <= pa.scalar(end_date, pa.date32()) if end_date else None,
+        ds.field("source").isin(list(sources)) if sources else None,
+        where,
+    ):
+        if condition is not None:
+            expression = condition if expression is None else expression & condition
+    table = dataset().to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+def read_day(scrape_date, columns=None, sources=None, where=None):
+    """Read the rows of a single scrape date."""
+    return read_history(scrape_date, scrape_date, columns=columns, sources=sources, where=where)
+
+def backfill(overwrite=False):
+    """Import every combined CSV in auction_exports/ whose date is not stored yet."""
+    stored = set(stored_dates())
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(EXPORT_DIR, "combined_auctions_*.csv"))):
+        scrape_date = export_date(path)
+        if scrape_date is None or (scrape_date in stored and not overwrite):
+            continue
+        try:
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+            write_day(df, scrape_date)
+            imported += 1
+        except Exception as e:
+            logger.error(f"Failed to import {path}: {e}")
+    logger.info(f"Backfilled {imported} days into {HISTORY_DIR}")
+    return imported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the Parquet auction history.")
+    parser.add_argument("--backfill", action="store_true", help="Import combined CSVs not yet in the store")
+    parser.add_argument("--overwrite", action="store_true", help="With --backfill, re-import dates already stored")
+    args = parser.parse_args()
+    if args.backfill:
+        backfill(overwrite=args.overwrite)
+    else:
+        parser.print_help()
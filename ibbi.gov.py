@@ -1,121 +1,188 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
 import logging
 import os
-import glob
-from datetime import datetime
-import shutil
-import psutil
-import tempfile  # Added for temporary directories
+import csv
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+import requests
+from browser_pool import USER_AGENT
+from scraper_base import Source, DOWNLOAD_DIR
+from export_catalog import STATUS_EMPTY, STATUS_FAILED
+from download_watcher import DownloadWatcher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Output directory
-DOWNLOAD_DIR = "auction_exports"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-
-def setup_chrome_options(user_data_dir):
-    """Set up Chrome options for headless browsing with a unique user data directory."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36")
-    chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-    chrome_options.add_experimental_option('prefs', {
-        "download.default_directory": os.path.abspath(DOWNLOAD_DIR),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True,
-        "safebrowsing.enabled": True
-    })
-    return chrome_options
-
-def cleanup_chrome_processes():
-    """Kill any lingering Chrome processes."""
-    for proc in psutil.process_iter(['name']):
-        if proc.info['name'] in ['chrome', 'chromedriver']:
-            try:
-                proc.kill()
-                logger.info(f"Killed lingering process: {proc.info['name']}")
-            except psutil.NoSuchProcess:
-                pass
+# Overridable so the HTTP export can be pointed at a local stand-in server
+BASE_URL = os.getenv("IBBI_BASE_URL", "https://ibbi.gov.in")
+LIST_URL = urljoin(BASE_URL, "/en/liquidation-auction-notices/lists")
+# "http" replays the export form without a browser and falls back to Chrome; "browser" always uses Chrome
+EXPORT_MODE = os.getenv("IBBI_EXPORT_MODE", "http")
+HTTP_TIMEOUT = 60
 
-def scrape_auctions():
-    """Scrape auction data from IBBI website and download Excel file."""
-    driver = None
-    user_data_dir = None
-    try:
-        # Clean up any lingering Chrome processes before starting
-        cleanup_chrome_processes()
-
-        # Create a temporary user data directory
-        user_data_dir = tempfile.mkdtemp(prefix="chrome_user_data_ibbi_")
-        chrome_options = setup_chrome_options(user_data_dir)
-        logger.info("Download directory set to: %s", os.path.abspath(DOWNLOAD_DIR))
-        driver = webdriver.Chrome(options=chrome_options)
-        
-        # Open IBBI auction site
-        driver.get("https://ibbi.gov.in/en/liquidation-auction-notices/lists")
-        logger.info("Waiting for page to load...")
-        time.sleep(5)  # Wait for JavaScript to render
-        
-        # Click EXPORT button
-        wait = WebDriverWait(driver, 30)
-        export_button = wait.until(EC.element_to_be_clickable((By.NAME, "export_excel")))
-        export_button.click()
-        logger.info("EXPORT button clicked!")
-        
-        # Wait for file to download
-        timeout = 120
-        start_time = time.time()
-        downloaded_file = None
-        while time.time() - start_time < timeout:
-            excel_files = glob.glob(os.path.join(DOWNLOAD_DIR, "*.xls"))
-            partial_files = glob.glob(os.path.join(DOWNLOAD_DIR, "*.crdownload"))
-            logger.info("Files in directory: %s", os.listdir(DOWNLOAD_DIR))
-            logger.info("Excel files found: %s", excel_files)
-            logger.info("Partial downloads: %s", partial_files)
-            if excel_files:
-                downloaded_file = excel_files[0]
-                break
-            time.sleep(1)
-        
-        if downloaded_file:
-            # Rename the downloaded file with date suffix
-            today_str = datetime.now().strftime('%Y%m%d')
-            new_filename = os.path.join(DOWNLOAD_DIR, f"ibbi_auctions_{today_str}.xls")
-            os.rename(downloaded_file, new_filename)
-            logger.info("Excel file renamed to: %s", new_filename)
-            return new_filename
+def find_export_form(page_html, page_url):
+    """Return (method, action URL, form fields) for the form holding the export_excel button."""
+    soup = BeautifulSoup(page_html, "html.parser")
+    button = soup.find(attrs={"name": "export_excel"})
+    if button is None:
+        raise ValueError("export_excel button not found on list page")
+    form = button.find_parent("form")
+    if form is None:
+        raise ValueError("export_excel button is not inside a form")
+
+    fields = {}
+    for field in form.find_all(["input", "select", "textarea"]):
+        name = field.get("name")
+        if not name:
+            continue
+        if field.name == "select":
+            option = field.find("option", selected=True) or field.find("option")
+            fields[name] = option.get("value", option.get_text(strip=True)) if option else ""
+        elif field.name == "textarea":
+            fields[name] = field.get_text()
         else:
-            logger.error("No Excel file found in %s after %d seconds", DOWNLOAD_DIR, timeout)
+            field_type = (field.get("type") or "text").lower()
+            if field_type in ("submit", "button", "image", "reset", "file"):
+                continue
+            if field_type in ("checkbox", "radio") and not field.has_attr("checked"):
+                continue
+            fields[name] = field.get("value", "")
+    # Only the clicked submit button is sent with the form
+    fields[button["name"]] = button.get("value", "")
+
+    method = (form.get("method") or "get").lower()
+    action = urljoin(page_url, form.get("action") or page_url)
+    return method, action, fields
+
+def export_via_http(output_file, paced):
+    """Download the export by replaying the list page's form submission over plain HTTP."""
+    with requests.Session() as session:
+        session.headers.update({"User-Agent": USER_AGENT})
+        with paced(LIST_URL):
+            page = session.get(LIST_URL, timeout=HTTP_TIMEOUT)
+            page.raise_for_status()
+        method, action, fields = find_export_form(page.text, page.url)
+        logger.info("Submitting export form (%s %s) with %d fields", method.upper(), action, len(fields))
+
+        request_kwargs = {"data": fields} if method == "post" else {"params": fields}
+        with paced(action):
+            response = session.request(method, action, stream=True, timeout=HTTP_TIMEOUT,
+                                       headers={"Referer": page.url}, **request_kwargs)
+            response.raise_for_status()
+        with response:
+            partial_file = output_file + ".part"
+            size = 0
+            with open(partial_file, "wb") as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if size == 0 and chunk.lstrip()[:15].lower().startswith((b"<!doctype", b"<html")):
+                        raise ValueError("Export returned an HTML page instead of the spreadsheet")
+                    f.write(chunk)
+                    size += len(chunk)
+    if size == 0:
+        os.remove(partial_file)
+        raise ValueError("Export response was empty")
+    os.replace(partial_file, output_file)
+    logger.info("Export downloaded over HTTP (%d bytes): %s", size, output_file)
+    return output_file
+
+class IbbiSource(Source):
+    """Liquidation auction notices exported from ibbi.gov.in."""
+
+    name = "ibbi"
+    output_prefix = "ibbi_auctions"
+    output_ext = "xls"
+    # The EXPORT button gets a real click, so keep stylesheets for a faithful layout
+    allowed_resources = ("*.css",)
+
+    def __init__(self, resume=False):
+        super().__init__(resume)
+        # The raw export is kept as-is and moved into place by write()
+        self.export_file = self.output_file + ".pending"
+
+    def export_via_browser(self, output_file):
+        """Download the export by clicking the EXPORT button in headless Chrome."""
+        watcher = DownloadWatcher(DOWNLOAD_DIR, pattern="*.xls")
+        try:
+            # Each run downloads into its own directory, so a stale or concurrent .xls is never picked up
+            with self.browser(download_dir=watcher.directory) as driver:
+                logger.info("Download directory set to: %s", os.path.abspath(watcher.directory))
+
+                # Open IBBI auction site and wait for the JavaScript-rendered EXPORT button
+                wait = WebDriverWait(driver, 30)
+                with self.paced(LIST_URL):
+                    driver.get(LIST_URL)
+                    logger.info("Waiting for page to load...")
+                    export_button = wait.until(EC.element_to_be_clickable((By.NAME, "export_excel")))
+
+                # Click EXPORT button
+                with self.paced(LIST_URL):
+                    export_button.click()
+                logger.info("EXPORT button clicked!")
+
+                # Wait for file to download
+                downloaded_file = watcher.wait_for_file(timeout=120)
+                if downloaded_file:
+                    return watcher.move_into_place(downloaded_file, output_file)
+                return None
+
+        except Exception as e:
+            self.check_cancelled()
+            logger.error("Scraping failed: %s", e)
             return None
-    
-    except Exception as e:
-        logger.error("Scraping failed: %s", e)
-        return None
-    
-    finally:
-        if driver:
-            driver.quit()
-            logger.info("Browser closed")
-        # Additional cleanup
-        cleanup_chrome_processes()
-        if user_data_dir and os.path.exists(user_data_dir):
+
+        finally:
+            watcher.cleanup()
+
+    def scrape(self):
+        """Download the export and return its tab-separated rows."""
+        exported = None
+        if EXPORT_MODE == "http":
             try:
-                shutil.rmtree(user_data_dir)
-                logger.info("Cleaned up user data directory: %s", user_data_dir)
+                exported = export_via_http(self.export_file, self.paced)
             except Exception as e:
-                logger.warning("Failed to clean up user data directory: %s", e)
+                logger.warning("HTTP export failed, falling back to Chrome: %s", e)
+                partial_file = self.export_file + ".part"
+                if os.path.exists(partial_file):
+                    os.remove(partial_file)
+        self.check_cancelled()
+        if not exported:
+            exported = self.export_via_browser(self.export_file)
+        if not exported:
+            return []
+        with open(exported, newline='', encoding="utf-8", errors="replace") as f:
+            rows = list(csv.DictReader(f, delimiter="\t"))
+        if not rows:
+            os.remove(exported)
+        return rows
+
+    def run(self):
+        """The export is a single download, so there are no pages to stream or resume."""
+        try:
+            rows = self.scrape()
+            if rows:
+                return self.write(rows)
+        except BaseException:
+            self.catalog_export(None, status=STATUS_FAILED)
+            raise
+        finally:
+            logger.info(f"{self.name}: throttled for {self.throttled:.1f}s by the rate limiter")
+        logger.info(f"{self.name}: no data found.")
+        self.catalog_export(None, rows=0, status=STATUS_EMPTY)
+        return None
+
+    def write(self, rows):
+        """Move the downloaded export into place as today's file."""
+        os.replace(self.export_file, self.output_file)
+        logger.info("Excel file saved to: %s (%d rows)", self.output_file, len(rows))
+        self.catalog_export(self.output_file, rows=len(rows))
+        return self.output_file
+
+def scrape_auctions():
+    """Scrape auction data from IBBI website and download Excel file."""
+    return IbbiSource().run()
 
 if __name__ == "__main__":
     scrape_auctions()
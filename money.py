@@ -0,0 +1,63 @@
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Values meaning "no amount given"; these become <NA> without counting as parse failures
+MISSING_MARKERS = ["", "-", "--", "nan", "na", "n/a", "nil", "none", "not available"]
+
+# Multipliers of the Indian unit words that may follow a number, e.g. "1.5 crore"
+UNIT_MULTIPLIERS = {
+    "lakh": 10**5, "lakhs": 10**5, "lac": 10**5, "lacs": 10**5,
+    "crore": 10**7, "crores": 10**7, "cr": 10**7,
+}
+
+# A plain number once currency signs and digit grouping are gone, optionally followed by a unit word
+AMOUNT_PATTERN = r"^(?P<number>\d+(?:\.\d+)?)(?P<unit>" + "|".join(sorted(UNIT_MULTIPLIERS, key=len, reverse=True)) + r")?$"
+
+def parse_money(values):
+    """Parse rupee amounts in any source's format into whole rupees (nullable Int64), vectorized.
+
+    Handles the ₹ sign, "Rs."/"INR" prefixes, "/-" suffixes, Indian digit grouping
+    ("56,00,000.00"), lakh/crore words and plain numbers. Missing markers become <NA>.
+    Returns (amounts, failed), where failed marks values that were present but unparseable.
+    """
+    text = values.astype("string[pyarrow]").str.strip().str.lower()
+    missing = text.isna() | text.isin(MISSING_MARKERS)
+    cleaned = (
+        text.str.replace(r"₹|\brs\.?|\binr\b|/-|,|\s", "", regex=True)
+        .str.rstrip(".")
+    )
+    numbers = pd.to_numeric(cleaned, errors="coerce")
+    # Only the few values that are not plain numbers go through the unit-word pattern
+    with_units = numbers.isna() & cleaned.str.contains(r"[a-z]", regex=True).fillna(False)
+    if with_units.any():
+        parts = cleaned[with_units].str.extract(AMOUNT_PATTERN)
+        numbers[with_units] = (
+            pd.to_numeric(parts["number"], errors="coerce") * parts["unit"].map(UNIT_MULTIPLIERS).fillna(1)
+        )
+    numbers = numbers.mask(numbers.abs() == float("inf"))
+    amounts = numbers.round().astype("Int64").mask(missing)
+    failed = amounts.isna() & ~missing
+    return amounts, failed
+
+def format_rupees(amount):
+    """A whole-rupee amount with Indian digit grouping, e.g. 1000000 -> "₹10,00,000"."""
+    amount = int(amount)
+    digits = str(abs(amount))
+    head, groups = digits[:-3], [digits[-3:]]
+    while head:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    return ("-" if amount < 0 else "") + "₹" + ",".join(groups)
+
+def log_failures(column, failed, values, groups=None):
+    """Log how many values of a column could not be parsed, per group if given, with a few examples."""
+    if not failed.any():
+        return
+    if groups is None:
+        counts = {column: int(failed.sum())}
+    else:
+        counts = groups[failed].value_counts().to_dict()
+    examples = values[failed].astype(str).unique()[:5].tolist()
+    logger.warning(f"{column}: {int(failed.sum())} values could not be parsed {counts}, e.g. {examples}")
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import os
+import time
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Normalized frames are cached next to the exports they were built from
+CACHE_DIR = os.path.join("auction_exports", ".normalized_cache")
+# Entries unused for this many days are dropped
+MAX_AGE_DAYS = float(os.getenv("NORMALIZED_CACHE_MAX_AGE_DAYS", "7"))
+# Least recently used entries are dropped once the cache grows past this size
+MAX_SIZE_MB = float(os.getenv("NORMALIZED_CACHE_MAX_MB", "200"))
+
+def file_digest(path):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class NormalizedCache:
+    """Parquet cache of normalized source frames keyed by input content and normalizer version.
+
+    A changed export or a changed normalizer (see process_and_combine.NORMALIZER_VERSION)
+    yields a new key, so stale frames are never returned; they just age out.
+    """
+
+    def __init__(self, version, directory=CACHE_DIR):
+        self.version = version
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, name, path):
+        key = hashlib.sha256(f"{name}\0{self.version}\0{file_digest(path)}".encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{name}-{key}.parquet")
+
+    def get(self, name, path):
+        """Return (cached frame or None, entry path)."""
+        entry = self.entry_path(name, path)
+        if not os.path.exists(entry):
+            return None, entry
+        try:
+            df = pd.read_parquet(entry)
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", entry, e)
+            return None, entry
+        os.utime(entry)  # Mark as recently used for eviction
+        return df, entry
+
+    def put(self, entry, df):
+        # Backfill workers can normalize the same export at once; each writes its own temp file
+        temp_file = f"{entry}.{os.getpid()}.tmp"
+        df.to_parquet(temp_file, index=False)
+        os.replace(temp_file, entry)
+
+    def evict(self):
+        """Drop entries older than MAX_AGE_DAYS, then the least recently used ones beyond MAX_SIZE_MB."""
+        entries = []
+        for filename in os.listdir(self.directory):
+            entry = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(entry)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        cutoff = time.time() - MAX_AGE_DAYS * 86400
+        budget = MAX_SIZE_MB * 1024 * 1024
+        total = 0
+        removed = 0
+        for mtime, size, entry in sorted(entries, reverse=True):
+            total += size
+            if mtime < cutoff or total > budget:
+                os.remove(entry)
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} normalized cache entries from {self.directory}")
@@ -0,0 +1,316 @@
+"""Alert delivery over pluggable channels through an async queue, with retries and a delivery log.
+
+Channels are SendGrid (HTTP API), SMTP and a JSON webhook (Slack, Teams, Mattermost or anything
+accepting {"text": ...}). Each channel runs at most NOTIFY_CONCURRENCY_<CHANNEL> deliveries at
+once; their blocking clients run in worker threads. Failed attempts are retried NOTIFY_RETRIES
+times with exponential backoff and jitter, unless the error is permanent (a rejected address, a
+4xx response). A message whose retries run out may carry fallback messages for another channel.
+
+Every message has an idempotency key. Keys already delivered according to the deliveries table
+(in ALERT_STATE_DB, without addresses) are skipped, so a re-run after a partial failure does not
+send twice, and the key is passed on to the provider where it takes one. Each delivery's channel,
+outcome, attempts and latency are recorded.
+
+    python notifier.py --log        # latest deliveries
+    python notifier.py --prune
+"""
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+import argparse
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import time
+import requests
+from python_http_client.exceptions import HTTPError
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import CustomArg
+from alert_state import ALERT_STATE_DB, TTL_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Attempts after the first failed one; the pause before a retry doubles from NOTIFY_BACKOFF_SECONDS
+RETRIES = int(os.getenv("NOTIFY_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "2"))
+MAX_BACKOFF = 60.0
+# Seconds one attempt may wait on the network
+TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "30"))
+# Deliveries in flight per channel, unless NOTIFY_CONCURRENCY_<CHANNEL> is set
+DEFAULT_CONCURRENCY = {"sendgrid": 4, "smtp": 2, "webhook": 4}
+
+# SMTP server for the smtp channel; empty disables it
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+# Upgrade the connection with STARTTLS before logging in (set 0 for local relays)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+# Incoming webhook URL that receives a JSON summary of every alert run; empty disables it
+WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+
+SENT = "sent"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+class PermanentError(Exception):
+    """A delivery failure that retrying cannot fix."""
+
+def idempotency_key(*parts):
+    """Stable key of a message's content, the same on every run that would send the same thing."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+def check_status(status_code, reason):
+    """Raise for an HTTP error status: PermanentError unless the request may succeed later (429, 5xx)."""
+    if status_code == 429 or status_code >= 500:
+        raise RuntimeError(f"HTTP {status_code} {reason}")
+    if status_code >= 400:
+        raise PermanentError(f"HTTP {status_code} {reason}")
+
+class Message:
+    """One delivery on one channel: the channel's payload, the recipients it reaches and its fallbacks."""
+
+    def __init__(self, channel, key, payload, recipients=(), fallback=()):
+        self.channel = channel
+        self.key = key
+        self.payload = payload
+        self.recipients = list(recipients)
+        self.fallback = list(fallback)
+
+class Channel:
+    """A delivery backend. deliver() is blocking and raises on failure; the notifier runs it in a thread."""
+    name = None
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency or int(
+            os.getenv(f"NOTIFY_CONCURRENCY_{self.name.upper()}", DEFAULT_CONCURRENCY[self.name])
+        )
+
+    def deliver(self, message):
+        raise NotImplementedError
+
+class SendGridChannel(Channel):
+    """Payload: a sendgrid Mail. The idempotency key is added as a custom arg, visible in event webhooks."""
+    name = "sendgrid"
+
+    def __init__(self, api_key, host="https://api.sendgrid.com", concurrency=None):
+        super().__init__(concurrency)
+        self.api_key = api_key
+        self.host = host
+
+    def deliver(self, message):
+        message.payload.custom_arg = CustomArg("idempotency_key", message.key)
+        # One client per call: the client object is not thread-safe
+        client = SendGridAPIClient(self.api_key, host=self.host)
+        client.client.timeout = TIMEOUT
+        try:
+            client.send(message.payload)
+        except HTTPError as e:
+            check_status(e.status_code, e.reason)
+            raise
+
+class SMTPChannel(Channel):
+    """Payload: email_message() arguments as a dict, built into the message only when it is sent.
+
+    5xx replies are permanent failures; 4xx replies and connection errors are retried.
+    """
+    name = "smtp"
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=SMTP_USERNAME, password=SMTP_PASSWORD,
+                 starttls=SMTP_STARTTLS, concurrency=None):
+        super().__init__(concurrency)
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls = starttls
+
+    def deliver(self, message):
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=TIMEOUT) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                refused = smtp.send_message(email_message(key=message.key, **message.payload))
+        except smtplib.SMTPRecipientsRefused as e:
+            raise PermanentError(f"all recipients refused: {e.recipients}")
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code >= 500:
+                raise PermanentError(f"SMTP {e.smtp_code} {e.smtp_error!r}")
+            raise
+        if refused:
+            logger.warning(f"smtp {message.key[:12]}: {len(refused)} recipients refused")
+
+class WebhookChannel(Channel):
+    """Payload: a JSON-serializable object, POSTed with an Idempotency-Key header."""
+    name = "webhook"
+
+    def __init__(self, url=WEBHOOK_URL, concurrency=None):
+        super().__init__(concurrency)
+        self.url = url
+
+    def deliver(self, message):
+        response = requests.post(self.url, json=message.payload, headers={"Idempotency-Key": message.key},
+                                 timeout=TIMEOUT)
+        check_status(response.status_code, response.reason)
+
+def email_message(sender, recipient, subject, body, attachments=(), key=None):
+    """A plain-text EmailMessage; attachments are (filename, MIME type, base64) tuples as AttachmentBuilder makes them."""
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    if key:
+        message["Message-ID"] = f"<{key}@{sender.split('@')[-1]}>"
+    message.set_content(body)
+    for filename, mime_type, content in attachments:
+        maintype, subtype = mime_type.split("/", 1)
+        message.add_attachment(base64.b64decode(content), maintype=maintype, subtype=subtype, filename=filename)
+    return message
+
+class DeliveryLog:
+    """SQLite table of delivery outcomes: key, channel, recipient count, status, attempts, latency, error."""
+
+    def __init__(self, path=ALERT_STATE_DB):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS deliveries (
+                key TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                recipients INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                latency REAL NOT NULL,
+                error TEXT,
+                finished TEXT NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS deliveries_key ON deliveries (key, status)")
+
+    def close(self):
+        self.connection.close()
+
+    def delivered(self, key):
+        return self.connection.execute(
+            "SELECT 1 FROM deliveries WHERE key = ? AND status = ?", (key, SENT)
+        ).fetchone() is not None
+
+    def add(self, record):
+        with self.connection:
+            self.connection.execute("INSERT INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+                record["key"], record["channel"], len(record["recipients"]), record["status"],
+                record["attempts"], record["latency"], record["error"], record["finished"],
+            ))
+
+    def latest(self, limit=20):
+        return self.connection.execute(
+            "SELECT finished, channel, status, recipients, attempts, latency, key, error FROM deliveries "
+            "ORDER BY finished DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def prune(self, ttl_days=TTL_DAYS, today=None):
+        """Drop deliveries older than ttl_days; returns how many were removed."""
+        cutoff = ((today or date.today()) - timedelta(days=ttl_days)).isoformat()
+        with self.connection:
+            return self.connection.execute("DELETE FROM deliveries WHERE finished < ?", (cutoff,)).rowcount
+
+class Notifier:
+    """Delivers messages through its channels from one asyncio queue."""
+
+    def __init__(self, channels, log=None):
+        self.channels = {channel.name: channel for channel in channels}
+        self.log = log or DeliveryLog()
+
+    def send(self, messages):
+        """Deliver the messages and any fallbacks they need; returns one record per delivery attempted."""
+        return asyncio.run(self.dispatch(messages))
+
+    async def dispatch(self, messages):
+        self.semaphores = {name: asyncio.Semaphore(channel.concurrency) for name, channel in self.channels.items()}
+        queue = asyncio.Queue()
+        for message in messages:
+            queue.put_nowait(message)
+        records = []
+        workers = [asyncio.create_task(self.worker(queue, records))
+                   for _ in range(sum(channel.concurrency for channel in self.channels.values()))]
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        outcomes = {status: sum(record["status"] == status for record in records) for status in (SENT, SKIPPED, FAILED)}
+        logger.info(f"Notifier: {outcomes[SENT]} sent, {outcomes[SKIPPED]} already sent, {outcomes[FAILED]} failed")
+        return records
+
+    async def worker(self, queue, records):
+        while True:
+            message = await queue.get()
+            try:
+                record = await self.deliver(message)
+                records.append(record)
+                fallback = [fallback for fallback in message.fallback if fallback.channel in self.channels]
+                if record["status"] == FAILED and fallback:
+                    logger.info(f"{message.channel} {message.key[:12]}: falling back to {len(fallback)} "
+                                f"{fallback[0].channel} message(s)")
+                    for fallback_message in fallback:
+                        queue.put_nowait(fallback_message)
+            except Exception as e:
+                logger.error(f"{message.channel} {message.key[:12]}: {e}")
+            finally:
+                queue.task_done()
+
+    async def deliver(self, message):
+        """Attempt a message until it is sent, fails permanently or runs out of retries."""
+        record = {"key": message.key, "channel": message.channel, "recipients": message.recipients,
+                  "status": SKIPPED, "attempts": 0, "latency": 0.0, "error": None}
+        if message.channel not in self.channels:
+            raise ValueError(f"No {message.channel} channel configured")
+        if self.log.delivered(message.key):
+            logger.info(f"{message.channel} {message.key[:12]}: already sent, skipping")
+            record["finished"] = datetime.now().isoformat(timespec="seconds")
+            return record
+
+        channel = self.channels[message.channel]
+        start = time.monotonic()
+        while True:
+            record["attempts"] += 1
+            try:
+                async with self.semaphores[message.channel]:
+                    await asyncio.to_thread(channel.deliver, message)
+                record["status"], record["error"] = SENT, None
+                break
+            except Exception as e:
+                record["status"], record["error"] = FAILED, f"{type(e).__name__}: {e}"
+                if isinstance(e, PermanentError) or record["attempts"] > RETRIES:
+                    break
+                backoff = min(MAX_BACKOFF, BACKOFF_BASE * 2 ** (record["attempts"] - 1)) * random.uniform(0.5, 1.0)
+                logger.warning(f"{message.channel} {message.key[:12]}: attempt {record['attempts']} failed "
+                               f"({record['error']}); retrying in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+        record["latency"] = round(time.monotonic() - start, 3)
+        record["finished"] = datetime.now().isoformat(timespec="seconds")
+        self.log.add(record)
+        log = logger.info if record["status"] == SENT else logger.error
+        log(f"{message.channel} {message.key[:12]}: {record['status']} to {len(message.recipients)} recipients "
+            f"after {record['attempts']} attempt(s) in {record['latency']:.2f}s"
+            + (f" ({record['error']})" if record["error"] else ""))
+        return record
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Inspect or prune the delivery log.")
+    parser.add_argument("--log", action="store_true", help="Show the latest deliveries")
+    parser.add_argument("--prune", action="store_true", help=f"Drop deliveries older than ALERT_STATE_TTL_DAYS ({TTL_DAYS})")
+    args = parser.parse_args()
+    log = DeliveryLog()
+    if args.prune:
+        logger.info(f"Pruned {log.prune()} deliveries")
+    if args.log:
+        for finished, channel, status, recipients, attempts, latency, key, error in log.latest():
+            print(f"{finished} {channel:8} {status:7} {recipients:5} recipients, {attempts} attempt(s), "
+                  f"{latency:.2f}s  {key[:12]}" + (f"  {error}" if error else ""))
+    if not (args.log or args.prune):
+        parser.print_help()
+    log.close()
@@ -1,146 +1,144 @@
 import pandas as pd
-import glob
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import csv
+import hashlib
+import inspect
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 import logging
 import os
+from history_store import write_day
+from change_feed import update_change_log
+from entity_resolution import assign_clusters
+from money import parse_money, log_failures
+import source_schemas
+from source_schemas import SOURCE_SCHEMAS
+from normalized_cache import NormalizedCache
+from export_catalog import get_catalog, STATUS_OK
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def process_and_combine():
-    combined_data = []
+# Columns of the combined file, in order (days_until_submission is added after combining)
+COMBINED_COLUMNS = [
+    "Auction ID", "Bank/Organisation Name", "City/District/Location", "last_date_of_submission",
+    "Reserve Price", "EMD", "Category", "Source"
+]
+ARROW_TYPES = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64()}
 
-    # Source 1: ibbi.gov.py (reads .xls file)
-    ibbi_files = glob.glob("auction_exports/ibbi_auctions_*.xls")
-    if ibbi_files:
-        try:
-            latest_ibbi = max(ibbi_files, key=os.path.getctime)
-            ibbi_gov = pd.read_csv(latest_ibbi, sep="\t", encoding="utf-8")
-            # Rename columns as per combine.ipynb
-            ibbi_gov.rename(columns={
-                'CIN No.': 'Auction ID',
-                'Last date of Submission': 'last_date_of_submission',
-                'Name of Corporate Debtor': 'Bank/Organisation Name'
-            }, inplace=True)
-            # Add missing columns with default value "-"
-            ibbi_gov["City/District/Location"] = "-"
-            ibbi_gov["EMD"] = "-"
-            ibbi_gov["Category"] = "-"
-            ibbi_gov["Source"] = "IBBI"
-            # Select required columns
-            ibbi_gov = ibbi_gov[["Auction ID", 'Bank/Organisation Name', "City/District/Location", 'last_date_of_submission', 'Reserve Price', "EMD", "Category", "Source"]]
-            # Standardize last_date_of_submission (already in DD-MM-YYYY, e.g., 02-06-2025)
-            ibbi_gov['last_date_of_submission'] = pd.to_datetime(
-                ibbi_gov['last_date_of_submission'], format='%d-%m-%Y', errors='coerce'
-            )
-            if ibbi_gov['last_date_of_submission'].isna().any():
-                logger.warning("Some dates in ibbi.gov last_date_of_submission could not be parsed.")
-            combined_data.append(ibbi_gov)
-        except Exception as e:
-            logger.error(f"Failed to process ibbi.gov data: {e}")
+def header_names(path, sep):
+    """Column names of a CSV header, with blank names filled in as "Unnamed: <position>" like pandas."""
+    with open(path, newline='', encoding="utf-8", errors="replace") as f:
+        header = next(csv.reader(f, delimiter=sep), [])
+    names = []
+    for i, name in enumerate(header):
+        name = name.strip() or f"Unnamed: {i}"
+        while name in names:
+            name += f".{i}"
+        names.append(name)
+    return names
 
-    # Source 2: albion_bank.py
-    albion_files = glob.glob("auction_exports/albion_auctions_*.csv")
-    if albion_files:
-        try:
-            latest_albion = max(albion_files, key=os.path.getctime)
-            albion_data = pd.read_csv(latest_albion)
-            # Rename columns as per combine.ipynb
-            albion_data.rename(columns={
-                "Bank Name": "Bank/Organisation Name",
-                "Auction Date": "last_date_of_submission",
-                "Location": "City/District/Location"
-            }, inplace=True)
-            # Get the first word from each Heading for Category
-            first_words = albion_data["Heading"].str.split().str[0]
-            albion_data['Category'] = first_words.values
-            albion_data["EMD"] = "-"
-            # Select required columns
-            albion_data = albion_data[["Auction ID", 'Bank/Organisation Name', 'City/District/Location', 'last_date_of_submission', 'Reserve Price', "EMD", "Category"]]
-            # Add source column
-            albion_data["Source"] = "Albion"
-            # Standardize last_date_of_submission (format: DD/MM/YYYY, e.g., 24/07/2025)
-            albion_data['last_date_of_submission'] = pd.to_datetime(
-                albion_data['last_date_of_submission'], format='%d/%m/%Y', errors='coerce'
-            )
-            if albion_data['last_date_of_submission'].isna().any():
-                logger.warning("Some dates in albion_bank last_date_of_submission could not be parsed.")
-            combined_data.append(albion_data)
-        except Exception as e:
-            logger.error(f"Failed to process albion_bank data: {e}")
+def read_source(schema, path):
+    """Read only the schema's usecols with explicit types through pyarrow's CSV reader."""
+    sep = schema.get("sep", ",")
+    names = header_names(path, sep)
+    missing = [column for column in schema["usecols"] if column not in names]
+    if missing:
+        raise ValueError(f"{path} has no columns {missing}")
+    dtypes = schema.get("dtypes", {})
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(column_names=names, skip_rows=1),
+        parse_options=pa_csv.ParseOptions(delimiter=sep, newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=schema["usecols"],
+            column_types={column: ARROW_TYPES[dtypes.get(column, "string")] for column in schema["usecols"]},
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
 
-    # Source 3: bank_e_auctions.py
-    bank_e_files = glob.glob("auction_exports/bank_e_auctions_*.csv")
-    if bank_e_files:
-        try:
-            latest_bank_e = max(bank_e_files, key=os.path.getctime)
-            bank_e = pd.read_csv(latest_bank_e)
-            # Drop unnecessary columns as per combine.ipynb
-            cols_to_drop = [
-                'Unnamed: 0', 'DRT Name', 'Unnamed: 10', 'Unnamed: 11',
-                'Unnamed: 12', 'Unnamed: 14', 'Event Type', "Asset on Auction"
-            ]
-            bank_e.drop(columns=[col for col in cols_to_drop if col in bank_e.columns], inplace=True)
-            # Rename columns as per combine.ipynb
-            bank_e.rename(columns={
-                'Unnamed: 13': 'Category',
-                'Sealed Bid Submission last date': 'last_date_of_submission',
-                "City/District": "City/District/Location"
-            }, inplace=True)
-            # Select required columns
-            bank_e = bank_e[["Auction ID", 'Bank/Organisation Name', 'City/District/Location', 'last_date_of_submission', 'Reserve Price', "EMD", "Category"]]
-            # Add source column
-            bank_e['Source'] = 'link_of_e_auction'
-            # Standardize last_date_of_submission (format: DD Mon YYYY, e.g., 21 May 2025)
-            bank_e['last_date_of_submission'] = pd.to_datetime(
-                bank_e['last_date_of_submission'], format='%d %b %Y', errors='coerce'
-            )
-            if bank_e['last_date_of_submission'].isna().any():
-                logger.warning("Some dates in bank_e_auctions last_date_of_submission could not be parsed.")
-            combined_data.append(bank_e)
-        except Exception as e:
-            logger.error(f"Failed to process bank_e_auctions data: {e}")
+def normalize_source(name, schema, path):
+    """Turn one source export into the combined columns, as declared in its schema."""
+    start = time.time()
+    df = read_source(schema, path)
+    read_seconds = time.time() - start
+    for column, derive in schema.get("derived", {}).items():
+        df[column] = derive(df)
+    df = df.rename(columns=schema.get("rename", {}))
+    if "fillna" in schema:
+        df = df.fillna(schema["fillna"])
+    df["Source"] = schema["label"]
+    df = df[COMBINED_COLUMNS]
+    # Standardize last_date_of_submission
+    df["last_date_of_submission"] = pd.to_datetime(
+        df["last_date_of_submission"], format=schema["date_format"], errors="coerce"
+    )
+    if df["last_date_of_submission"].isna().any():
+        logger.warning(f"Some dates in {name} last_date_of_submission could not be parsed.")
+    logger.info(f"{name}: {len(df)} rows from {path} in {time.time() - start:.3f}s "
+                f"(read {read_seconds:.3f}s, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+    return df
+
+def normalizer_version():
+    """Hash of the code that shapes normalized frames, so cached frames die with any change to it."""
+    digest = hashlib.sha256()
+    for code in (inspect.getsource(source_schemas), inspect.getsource(header_names),
+                 inspect.getsource(read_source), inspect.getsource(normalize_source),
+                 repr(COMBINED_COLUMNS), pd.__version__, pa.__version__):
+        digest.update(code.encode())
+    return digest.hexdigest()[:16]
+
+NORMALIZER_VERSION = normalizer_version()
+
+def combine_day(scrape_date, paths):
+    """Normalize the given source exports into the combined CSV and history partition for scrape_date.
 
-    # Source 4: web3_scrape.py
-    web3_files = glob.glob("auction_exports/web3_auctions_*.csv")
-    if web3_files:
+    paths maps source name -> export file. days_until_submission counts from scrape_date.
+    Returns (output file, row count), or None if there was nothing to combine.
+    """
+    combined_data = []
+    cache = NormalizedCache(NORMALIZER_VERSION)
+    rebuilt = 0
+
+    for name, schema in SOURCE_SCHEMAS.items():
+        path = paths.get(name)
+        if not path:
+            logger.warning(f"No good {name} export for {scrape_date}.")
+            continue
         try:
-            latest_web3 = max(web3_files, key=os.path.getctime)
-            web3_data = pd.read_csv(latest_web3)
-            # Derive Bank/Organisation Name and Location as per combine.ipynb
-            web3_data["Bank/Organisation Name"] = web3_data["Organisation Chain"].str.split('|').str[:3].str.join('|')
-            web3_data['City/District/Location'] = web3_data["Bank/Organisation Name"].str.extract(r'Govt of ([^|]*)')[0].str.strip()
-            # Rename columns as per combine.ipynb
-            web3_data.rename(columns={
-                "Auction ID": "Auction ID",
-                "Submission End Date": "last_date_of_submission",
-                "Starting Price": "Reserve Price",
-                "EMD Amount": "EMD",
-                'Product Category': "Category"
-            }, inplace=True)
-            web3_data.fillna("-", inplace=True)
-            # Select required columns
-            web3_data = web3_data[["Auction ID", 'Bank/Organisation Name', "City/District/Location", 'last_date_of_submission', 'Reserve Price', "EMD", "Category"]]
-            # Add source column
-            web3_data["Source"] = "link_of_website_web3"
-            # Standardize last_date_of_submission (format: DD-Mon-YYYY HH:MM AM/PM, e.g., 24-May-2025 09:30 AM)
-            web3_data['last_date_of_submission'] = pd.to_datetime(
-                web3_data['last_date_of_submission'], format='%d-%b-%Y %I:%M %p', errors='coerce'
-            )
-            if web3_data['last_date_of_submission'].isna().any():
-                logger.warning("Some dates in web3_scrape last_date_of_submission could not be parsed.")
-            combined_data.append(web3_data)
+            df, entry = cache.get(name, path)
+            if df is None:
+                df = normalize_source(name, schema, path)
+                cache.put(entry, df)
+                rebuilt += 1
+            else:
+                logger.info(f"{name}: {path} unchanged, using cached normalized frame")
+            combined_data.append(df)
         except Exception as e:
-            logger.error(f"Failed to process web3_scrape data: {e}")
+            logger.error(f"Failed to process {name} data: {e}")
+    logger.info(f"Normalized {rebuilt} of {len(combined_data)} sources ({len(combined_data) - rebuilt} from the cache)")
 
     # Combine all data
     if combined_data:
         final_df = pd.concat(combined_data, ignore_index=True)
 
-        # Calculate days_until_submission
-        today = pd.to_datetime(datetime.now().date())
+        # Reserve Price and EMD arrive as ₹-prefixed, Indian-grouped or plain strings; keep whole rupees
+        for column in ["Reserve Price", "EMD"]:
+            values = final_df[column]
+            final_df[column], failed = parse_money(values)
+            log_failures(column, failed, values, groups=final_df["Source"])
+
+        # Calculate days_until_submission relative to the scrape date
+        today = pd.to_datetime(scrape_date)
         final_df['days_until_submission'] = (final_df['last_date_of_submission'] - today).dt.days
 
+        # The same property listed on several portals shares one cluster_id
+        final_df['cluster_id'] = assign_clusters(final_df)
+
         # Convert last_date_of_submission back to string in DD-MM-YYYY format
         final_df['last_date_of_submission'] = final_df['last_date_of_submission'].dt.strftime('%d-%m-%Y')
         # Replace NaT (failed parsing) with "-"
@@ -148,14 +146,92 @@ def process_and_combine():
         final_df['days_until_submission'] = final_df['days_until_submission'].fillna('-')
 
         # Save to CSV
-        today_str = datetime.now().strftime('%Y%m%d')
-        output_file = f"auction_exports/combined_auctions_{today_str}.csv"
+        output_file = f"auction_exports/combined_auctions_{scrape_date:%Y%m%d}.csv"
         final_df.to_csv(output_file, index=False)
         logger.info("Combined data saved to: %s", output_file)
-        return output_file
+
+        # Keep a typed copy in the Parquet history store
+        try:
+            write_day(final_df, scrape_date)
+        except Exception as e:
+            logger.error(f"Failed to update the history store: {e}")
+        return output_file, len(final_df)
     else:
-        logger.error("No data to combine.")
+        logger.error(f"No data to combine for {scrape_date}.")
+        return None
+
+def process_and_combine():
+    """Combine the latest good export of every source into today's combined file."""
+    catalog = get_catalog()
+    paths = {name: catalog.latest_path(name) for name in SOURCE_SCHEMAS}
+    result = combine_day(datetime.now().date(), paths)
+    NormalizedCache(NORMALIZER_VERSION).evict()
+    if not result:
         return None
+    output_file, rows = result
+    catalog.record("combined", output_file, rows=rows, schema_version=NORMALIZER_VERSION)
+    refresh_change_log()
+    return output_file
+
+def refresh_change_log():
+    """Diff the newly written history partitions; a failure here must not fail the combine."""
+    try:
+        update_change_log()
+    except Exception as e:
+        logger.error(f"Failed to update the change log: {e}")
+
+def combine_day_job(job):
+    """Process-pool entry point; logs and swallows errors so one bad day does not stop a backfill."""
+    scrape_date, paths = job
+    try:
+        return scrape_date, combine_day(scrape_date, paths)
+    except Exception as e:
+        logger.error(f"Failed to combine {scrape_date}: {e}")
+        return scrape_date, None
+
+def backfill(start_date, end_date, workers=None):
+    """Rebuild the combined file of every day in the range from that day's own exports, in parallel.
+
+    Exports are looked up in the catalog by scrape date, so days are never mixed. The
+    catalog is only written here in the parent, after the workers finish.
+    """
+    catalog = get_catalog()
+    jobs = []
+    day = start_date
+    while day <= end_date:
+        paths = {}
+        for name in SOURCE_SCHEMAS:
+            entry = catalog.for_date(name, day)
+            if entry and entry["status"] == STATUS_OK and entry["path"] and os.path.exists(entry["path"]):
+                paths[name] = entry["path"]
+        if paths:
+            jobs.append((day, paths))
+        else:
+            logger.info(f"No exports for {day}; skipping.")
+        day += timedelta(days=1)
+
+    start = time.time()
+    rebuilt = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for scrape_date, result in executor.map(combine_day_job, jobs):
+            if not result:
+                continue
+            output_file, rows = result
+            catalog.record("combined", output_file, rows=rows, schema_version=NORMALIZER_VERSION, scrape_date=scrape_date)
+            rebuilt += 1
+    NormalizedCache(NORMALIZER_VERSION).evict()
+    if rebuilt:
+        refresh_change_log()
+    logger.info(f"Rebuilt {rebuilt} of {len(jobs)} days from {start_date} to {end_date} in {time.time() - start:.1f}s")
+    return rebuilt
 
 if __name__ == "__main__":
-    process_and_combine()
+    parser = argparse.ArgumentParser(description="Combine the latest exports, or rebuild past days with --start/--end.")
+    parser.add_argument("--start", type=date.fromisoformat, help="First scrape date to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last scrape date to rebuild (default: --start)")
+    parser.add_argument("--workers", type=int, help="Worker processes for rebuilding (default: CPU count)")
+    args = parser.parse_args()
+    if args.start:
+        backfill(args.start, args.end or args.start, args.workers)
+    else:
+        process_and_combine()
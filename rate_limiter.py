@@ -0,0 +1,107 @@
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Requests per second each host starts at, and the range the pacer adapts within
+INITIAL_RATE = float(os.getenv("PACER_INITIAL_RATE", "1"))
+MIN_RATE = float(os.getenv("PACER_MIN_RATE", "0.05"))
+MAX_RATE = float(os.getenv("PACER_MAX_RATE", "8"))
+# Requests a host may receive back to back once it has been idle
+BURST = 2
+# Responses slower than this (seconds) are taken as a sign the host is struggling
+SLOW_LATENCY = float(os.getenv("PACER_SLOW_LATENCY", "5"))
+# Rate multipliers for fast, slow and failed responses
+SPEEDUP = 1.1
+SLOWDOWN = 0.75
+FAILURE_SLOWDOWN = 0.5
+# Pause after a failure, doubled for every further consecutive failure
+BACKOFF_BASE = 2.0
+MAX_BACKOFF = 120.0
+
+class HostPacer:
+    """Token bucket for one host whose rate follows response latency and errors."""
+
+    def __init__(self, host, rate=INITIAL_RATE):
+        self.host = host
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(BURST, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cancel_event=None):
+        """Block until the host may be sent another request; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.refill(now)
+                if now < self.backoff_until:
+                    delay = self.backoff_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    return waited + delay
+            else:
+                time.sleep(delay)
+            waited += delay
+
+    def record(self, latency, ok=True):
+        """Adapt the rate to the outcome of a request: speed up when fast, back off on errors."""
+        with self.lock:
+            if not ok:
+                self.failures += 1
+                self.rate = max(MIN_RATE, self.rate * FAILURE_SLOWDOWN)
+                backoff = min(MAX_BACKOFF, BACKOFF_BASE * 2 ** (self.failures - 1))
+                backoff *= random.uniform(0.5, 1.0)
+                self.backoff_until = max(self.backoff_until, time.monotonic() + backoff)
+                self.tokens = min(self.tokens, 0.0)
+                logger.warning(f"{self.host}: request failed ({self.failures} in a row), backing off {backoff:.1f}s "
+                               f"at {self.rate:.2f} req/s")
+                return
+            self.failures = 0
+            if latency > SLOW_LATENCY:
+                self.rate = max(MIN_RATE, self.rate * SLOWDOWN)
+                logger.info(f"{self.host}: slow response ({latency:.1f}s), slowing to {self.rate:.2f} req/s")
+            else:
+                self.rate = min(MAX_RATE, self.rate * SPEEDUP)
+
+class RateLimiter:
+    """Per-host pacers shared by every scraper in the process."""
+
+    def __init__(self):
+        self.pacers = {}
+        self.lock = threading.Lock()
+
+    def pacer(self, url):
+        """Return the pacer of the URL's host, creating it on first use."""
+        host = urlparse(url).netloc or url
+        with self.lock:
+            if host not in self.pacers:
+                self.pacers[host] = HostPacer(host)
+            return self.pacers[host]
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """Return the process-wide rate limiter."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,126 @@
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from browser_pool import get_pool
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Source name -> (script, class); ibbi.gov.py is not importable by name, so scripts are loaded by path
+SOURCES = {
+    "ibbi": ("ibbi.gov.py", "IbbiSource"),
+    "albion": ("albion_bank.py", "AlbionSource"),
+    "bank_e": ("bank_e_auctions.py", "BankESource"),
+    "web3": ("web3_scrape.py", "Web3Source"),
+}
+
+DEFAULT_TIMEOUT = int(os.getenv("SCRAPER_TIMEOUT", "3600"))
+DEFAULT_RETRIES = int(os.getenv("SCRAPER_RETRIES", "1"))
+# Seconds a cancelled scrape gets to notice and wind down before it is abandoned
+CANCEL_GRACE = 30
+
+class ScrapeAbandoned(Exception):
+    """A timed-out scrape whose thread did not stop; it may still write its files and hold browsers."""
+
+def load_source_class(name):
+    """Import a scraper script by path and return its Source class."""
+    script, class_name = SOURCES[name]
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+    spec = importlib.util.spec_from_file_location(f"{name}_source", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+def run_attempt(source, timeout):
+    """Run one scrape in a daemon thread; cancel it if it exceeds the timeout.
+
+    Raises TimeoutError once a cancelled scrape has stopped, or ScrapeAbandoned if its thread is
+    still running after CANCEL_GRACE.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome["path"] = source.run()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name=f"scrape-{source.name}", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        logger.error(f"{source.name}: timed out after {timeout}s, cancelling")
+        source.cancel()
+        thread.join(CANCEL_GRACE)
+        if thread.is_alive():
+            raise ScrapeAbandoned(f"{source.name} scrape exceeded {timeout}s and did not stop within {CANCEL_GRACE}s")
+        raise TimeoutError(f"{source.name} scrape exceeded {timeout}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("path")
+
+def run_source(name, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, resume=False):
+    """Scrape one source with a timeout per attempt and retries; returns the written file or None.
+
+    Retries resume from the failed attempt's checkpoint instead of starting over, so a source
+    whose cancelled attempt is still running is given up rather than retried.
+
+    SCRAPER_TIMEOUT_<NAME> (e.g. SCRAPER_TIMEOUT_ALBION) overrides the timeout for one source.
+    """
+    timeout = int(os.getenv(f"SCRAPER_TIMEOUT_{name.upper()}", timeout))
+    source_class = load_source_class(name)
+    for attempt in range(1, retries + 2):
+        start = time.time()
+        source = source_class(resume=resume or attempt > 1)
+        try:
+            path = run_attempt(source, timeout)
+        except ScrapeAbandoned as e:
+            logger.error(f"{name}: {e}; not retrying while it can still write the partial export and checkpoint")
+            return None
+        except Exception as e:
+            logger.error(f"{name}: attempt {attempt} failed after {time.time() - start:.1f}s "
+                         f"({source.throttled:.1f}s throttled): {e}")
+            continue
+        logger.info(f"{name}: finished in {time.time() - start:.1f}s ({source.throttled:.1f}s throttled) -> {path}")
+        return path
+    logger.error(f"{name}: giving up after {retries + 1} attempts")
+    return None
+
+def run_all(names, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, resume=False):
+    """Run the given sources concurrently; each writes its file as soon as it finishes."""
+    start = time.time()
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            futures = {name: executor.submit(run_source, name, timeout, retries, resume) for name in names}
+            for name, future in futures.items():
+                results[name] = future.result()
+    finally:
+        get_pool().close()
+    for name in names:
+        logger.info(f"{name}: {results.get(name) or 'FAILED'}")
+    logger.info(f"All scrapers finished in {time.time() - start:.1f}s")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the auction scrapers concurrently in one process.")
+    parser.add_argument("--sources", nargs="+", choices=sorted(SOURCES), default=list(SOURCES),
+                        help="Sources to scrape (default: all)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Per-attempt timeout in seconds")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Retries per source after a failure")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue today's interrupted scrapes from their checkpoints")
+    args = parser.parse_args()
+
+    results = run_all(args.sources, args.timeout, args.retries, args.resume)
+    # Combining still works with a partial set, so only fail when every source failed
+    return 0 if any(results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+from contextlib import contextmanager
+from datetime import datetime
+import argparse
+import logging
+import os
+import threading
+import time
+from browser_pool import get_pool
+from checkpoint import RowCollector, StreamingWriter
+from export_catalog import get_catalog, STATUS_OK, STATUS_EMPTY, STATUS_FAILED
+from rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+# Output directory
+DOWNLOAD_DIR = "auction_exports"
+
+class ScrapeCancelled(Exception):
+    """Raised inside a scraper once the runner has cancelled it."""
+
+class Source:
+    """Common interface of the auction scrapers: scrape() returns rows, run() streams them to a file."""
+
+    name = None
+    output_prefix = None
+    output_ext = "csv"
+    fieldnames = None
+    # Entries of browser_pool.BLOCKED_URL_PATTERNS this source still needs to load
+    allowed_resources = ()
+
+    def __init__(self, resume=False):
+        self.resume = resume
+        self.pool = get_pool()
+        self.limiter = get_limiter()
+        self.cancel_event = threading.Event()
+        self.drivers = set()
+        # Seconds spent waiting on the rate limiter, summed over all threads of this scrape
+        self.throttled = 0.0
+        self.throttled_lock = threading.Lock()
+        self.today_str = datetime.now().strftime('%Y%m%d')
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+
+    @property
+    def scrape_date(self):
+        return datetime.strptime(self.today_str, '%Y%m%d').date()
+
+    @property
+    def output_file(self):
+        return os.path.join(DOWNLOAD_DIR, f"{self.output_prefix}_{self.today_str}.{self.output_ext}")
+
+    def row_id(self, row):
+        """Auction ID of a scraped row, used to skip duplicates; None disables the check."""
+        return None
+
+    def scrape_into(self, sink):
+        """Scrape the source, handing each finished page to sink.write_page(rows, page)."""
+        raise NotImplementedError
+
+    def scrape(self):
+        """Scrape the source and return its rows."""
+        collector = RowCollector(key=self.row_id)
+        self.scrape_into(collector)
+        self.fieldnames = collector.fieldnames or self.fieldnames
+        return collector.rows
+
+    def run(self):
+        """Stream pages into the dated output file; returns its path, or None if nothing was scraped."""
+        writer = StreamingWriter(self.output_file, key=self.row_id, fieldnames=self.fieldnames, resume=self.resume)
+        try:
+            self.scrape_into(writer)
+        except BaseException:
+            writer.close()
+            self.catalog_export(None, status=STATUS_FAILED)
+            raise
+        finally:
+            logger.info(f"{self.name}: throttled for {self.throttled:.1f}s by the rate limiter")
+        path = writer.finish()
+        if not path:
+            logger.info(f"{self.name}: no data found.")
+            self.catalog_export(None, rows=0, status=STATUS_EMPTY)
+            return None
+        self.catalog_export(path, rows=writer.rows_written)
+        return path
+
+    def catalog_export(self, path, rows=None, status=STATUS_OK):
+        """Record today's export (or failed/empty run) in the catalog; never fails the scrape."""
+        try:
+            get_catalog().record(self.name, path, rows=rows, status=status, scrape_date=self.scrape_date)
+        except Exception as e:
+            logger.error(f"{self.name}: failed to update the export catalog: {e}")
+
+    @contextmanager
+    def browser(self, download_dir=DOWNLOAD_DIR):
+        """Lease a pooled browser that cancel() can shut down."""
+        self.check_cancelled()
+        driver = self.pool.acquire(download_dir, self.allowed_resources)
+        self.drivers.add(driver)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.drivers.discard(driver)
+            self.pool.release(driver, broken=broken or self.cancelled)
+            logger.info("Browser released")
+
+    @contextmanager
+    def paced(self, url):
+        """Wait for the host's turn, then feed the latency or failure of the block back to its pacer."""
+        pacer = self.limiter.pacer(url)
+        waited = pacer.acquire(self.cancel_event)
+        with self.throttled_lock:
+            self.throttled += waited
+        self.check_cancelled()
+        start = time.time()
+        try:
+            yield
+        except ScrapeCancelled:
+            raise
+        except Exception:
+            pacer.record(time.time() - start, ok=False)
+            raise
+        pacer.record(time.time() - start)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Stop the scrape at the next page boundary once cancelled."""
+        if self.cancelled:
+            raise ScrapeCancelled(f"{self.name} scrape cancelled")
+
+    def cancel(self):
+        """Ask the scrape to stop and quit its browsers so blocked WebDriver calls return."""
+        self.cancel_event.set()
+        for driver in list(self.drivers):
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning("Failed to quit browser of cancelled %s scrape: %s", self.name, e)
+
+def run_cli(source_class):
+    """Command-line entry point shared by the scraper scripts."""
+    parser = argparse.ArgumentParser(description=f"Scrape {source_class.name} auctions into {DOWNLOAD_DIR}/.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue today's interrupted run from its last checkpointed page")
+    args = parser.parse_args()
+    return source_class(resume=args.resume).run()
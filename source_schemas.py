@@ -0,0 +1,92 @@
+"""How each scraper's export maps onto the combined schema.
+
+Every entry of SOURCE_SCHEMAS is read and normalized by the generic engine in
+process_and_combine.py, so adding a source only needs a new entry here. Keys are the
+scrapers' Source.name, under which their exports are listed in the export catalog.
+
+    label        value of the combined Source column
+    sep          field separator (default ",")
+    usecols      the only columns decoded; blank headers are named "Unnamed: <position>" like pandas
+    dtypes       column -> "string", "float64" or "int64" (default "string")
+    derived      new column -> function(frame) computed before renaming, in order
+    rename       source column -> combined column
+    fillna       value for missing cells after renaming (optional)
+    date_format  strptime format of last_date_of_submission
+"""
+
+def constant(value):
+    """Derived column holding the same value on every row."""
+    return lambda df: value
+
+def first_word(column):
+    """Derived column with the first word of another column."""
+    return lambda df: df[column].str.split().str[0]
+
+def join_parts(column, sep, count):
+    """Derived column with the first `count` sep-separated parts of another column."""
+    return lambda df: df[column].str.split(sep).str[:count].str.join(sep)
+
+def extract(column, pattern):
+    """Derived column with the first capture group of a regex over another column."""
+    return lambda df: df[column].str.extract(pattern)[0].str.strip()
+
+SOURCE_SCHEMAS = {
+    "ibbi": {
+        "label": "IBBI",
+        "sep": "\t",
+        "usecols": ["CIN No.", "Name of Corporate Debtor", "Reserve Price", "Last date of Submission"],
+        "derived": {
+            "City/District/Location": constant("-"),
+            "EMD": constant("-"),
+            "Category": constant("-"),
+        },
+        "rename": {
+            "CIN No.": "Auction ID",
+            "Last date of Submission": "last_date_of_submission",
+            "Name of Corporate Debtor": "Bank/Organisation Name",
+        },
+        "date_format": "%d-%m-%Y",  # e.g. 02-06-2025
+    },
+    "albion": {
+        "label": "Albion",
+        "usecols": ["Auction ID", "Heading", "Location", "Bank Name", "Reserve Price", "Auction Date"],
+        "derived": {
+            "Category": first_word("Heading"),
+            "EMD": constant("-"),
+        },
+        "rename": {
+            "Bank Name": "Bank/Organisation Name",
+            "Auction Date": "last_date_of_submission",
+            "Location": "City/District/Location",
+        },
+        "date_format": "%d/%m/%Y",  # e.g. 24/07/2025
+    },
+    "bank_e": {
+        "label": "link_of_e_auction",
+        "usecols": ["Auction ID", "Bank/Organisation Name", "City/District", "Sealed Bid Submission last date",
+                    "Reserve Price", "EMD", "Unnamed: 13"],
+        "rename": {
+            "Unnamed: 13": "Category",
+            "Sealed Bid Submission last date": "last_date_of_submission",
+            "City/District": "City/District/Location",
+        },
+        "date_format": "%d %b %Y",  # e.g. 21 May 2025
+    },
+    "web3": {
+        "label": "link_of_website_web3",
+        "usecols": ["Organisation Chain", "Auction ID", "EMD Amount", "Starting Price", "Submission End Date",
+                    "Product Category"],
+        "derived": {
+            "Bank/Organisation Name": join_parts("Organisation Chain", "|", 3),
+            "City/District/Location": extract("Organisation Chain", r"Govt of ([^|]*)"),
+        },
+        "rename": {
+            "Submission End Date": "last_date_of_submission",
+            "Starting Price": "Reserve Price",
+            "EMD Amount": "EMD",
+            "Product Category": "Category",
+        },
+        "fillna": "-",
+        "date_format": "%d-%b-%Y %I:%M %p",  # e.g. 24-May-2025 09:30 AM
+    },
+}
@@ -0,0 +1,228 @@
+"""Per-subscriber alert filters, matched against one day's auctions in a single pass.
+
+Subscriptions live in subscriptions.json (SUBSCRIPTIONS_FILE), a list of objects such as
+
+    {"email": "a@example.com", "banks": ["HDFC", "SBI"], "locations": ["Pune", "Tamil Nadu"],
+     "categories": ["Flat"], "sources": ["albion"], "min_price": 1000000, "max_price": 5000000,
+     "min_days": 0, "max_days": 14}
+
+Every field but email is optional, and each email may only appear once. Text filters match
+case-insensitively anywhere in the value and any one term of a list is enough; all given fields
+must match. In CI the same list comes from the SUBSCRIPTIONS_JSON secret, since the file holds
+addresses and is not committed.
+
+    python subscriptions.py --list
+    python subscriptions.py --add a@example.com --banks HDFC --max-days 14
+    python subscriptions.py --remove a@example.com
+    python subscriptions.py --match     # matches per subscriber on the latest stored day
+"""
+import argparse
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from entity_resolution import normalize_bank, normalize_text
+from history_store import SOURCE_PARTITIONS
+from money import format_rupees
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_FILE = os.getenv("SUBSCRIPTIONS_FILE", "subscriptions.json")
+# The subscriptions as a JSON string, e.g. from a CI secret; used instead of SUBSCRIPTIONS_FILE when set
+SUBSCRIPTIONS_JSON = os.getenv("SUBSCRIPTIONS_JSON", "")
+# Deadline window of subscriptions that do not set one, and of RECIPIENT_EMAILS without a file
+ALERT_DAYS = int(os.getenv("ALERT_DAYS", "7"))
+
+# Subscription field -> combined column it filters
+TEXT_FILTERS = {
+    "banks": "Bank/Organisation Name",
+    "locations": "City/District/Location",
+    "categories": "Category",
+    "sources": "Source",
+}
+RANGE_FILTERS = {
+    "price": ("min_price", "max_price", "Reserve Price"),
+    "days": ("min_days", "max_days", "days_until_submission"),
+}
+FIELDS = ["email"] + list(TEXT_FILTERS) + [bound for low, high, _ in RANGE_FILTERS.values() for bound in (low, high)]
+
+def normalize_terms(field, terms):
+    """Filter terms normalized like the column values they are compared with."""
+    if isinstance(terms, str):
+        terms = [terms]
+    if field == "sources":
+        # Partition names such as "bank_e" stand for their Source label
+        labels = {partition: label for label, partition in SOURCE_PARTITIONS.items()}
+        terms = [labels.get(term, term) for term in terms]
+    normalize = normalize_bank if field == "banks" else normalize_text
+    return normalize(pd.Series(terms, dtype="string")).dropna().tolist()
+
+def validate(subscription):
+    """Check a subscription's fields, returning it with defaults filled in; raises ValueError."""
+    unknown = set(subscription) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown subscription fields {sorted(unknown)}; expected some of {FIELDS}")
+    email = subscription.get("email", "")
+    if "@" not in email:
+        raise ValueError(f"Invalid subscription email: {email!r}")
+    subscription = dict(subscription)
+    for bound, default in (("min_days", 0), ("max_days", ALERT_DAYS)):
+        if subscription.get(bound) is None:
+            subscription[bound] = default
+    for low, high, _ in RANGE_FILTERS.values():
+        for bound in (low, high):
+            if subscription.get(bound) is not None and not isinstance(subscription[bound], (int, float)):
+                raise ValueError(f"{email}: {bound} must be a number")
+    return subscription
+
+def validate_all(subscriptions):
+    """Validate a list of subscriptions; raises ValueError if an email appears twice.
+
+    Matches are keyed by email, so a second entry would silently replace the first.
+    """
+    subscriptions = [validate(subscription) for subscription in subscriptions]
+    seen = set()
+    for subscription in subscriptions:
+        email = subscription["email"].strip().lower()
+        if email in seen:
+            raise ValueError(f"Duplicate subscription for {subscription['email']}; merge its filters into one entry")
+        seen.add(email)
+    return subscriptions
+
+def load_subscriptions(path=SUBSCRIPTIONS_FILE):
+    """Validated subscriptions from SUBSCRIPTIONS_JSON or the file, or None if there are neither."""
+    if SUBSCRIPTIONS_JSON:
+        return validate_all(json.loads(SUBSCRIPTIONS_JSON))
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return validate_all(json.load(f))
+
+def save_subscriptions(subscriptions, path=SUBSCRIPTIONS_FILE):
+    temp_file = path + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(subscriptions, f, indent=2)
+    os.replace(temp_file, path)
+
+def default_subscriptions(recipient_emails, min_price=0):
+    """The same deadline window for every address of RECIPIENT_EMAILS, as before subscriptions existed."""
+    if isinstance(recipient_emails, str):
+        recipient_emails = [email.strip() for email in recipient_emails.split(",") if email.strip()]
+    # An address listed twice is alerted once
+    unique = {}
+    for email in recipient_emails:
+        unique.setdefault(email.lower(), email)
+    return [validate({"email": email, "min_price": min_price or None}) for email in unique.values()]
+
+def describe(subscription):
+    """Short text of a subscription's filters, e.g. "banks: HDFC; deadline in 0-14 days"."""
+    parts = []
+    for field in TEXT_FILTERS:
+        terms = subscription.get(field)
+        if terms:
+            parts.append(f"{field}: {', '.join([terms] if isinstance(terms, str) else terms)}")
+    if subscription.get("min_price") or subscription.get("max_price"):
+        parts.append(f"reserve price {format_rupees(subscription.get('min_price') or 0)}-"
+                     + (format_rupees(subscription["max_price"]) if subscription.get("max_price") else "any"))
+    parts.append(f"deadline in {subscription['min_days']}-{subscription['max_days']} days")
+    return "; ".join(parts)
+
+class AuctionIndex:
+    """Column indexes over one day's auctions, shared by every subscription.
+
+    Text columns are factorized once, so a filter term is only compared with the distinct
+    values and becomes a row bitmap. Numeric columns are sorted once, so a range becomes a
+    bitmap through two binary searches. Bitmaps are cached, so subscribers using the same
+    term or range share the work, and the frame itself is never filtered per subscriber.
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.codes = {}
+        self.uniques = {}
+        for field, column in TEXT_FILTERS.items():
+            normalize = normalize_bank if field == "banks" else normalize_text
+            codes, uniques = pd.factorize(normalize(df[column]))
+            self.codes[field] = codes
+            self.uniques[field] = pd.Series(uniques, dtype="string")
+        self.sorted = {}
+        for field, (_, _, column) in RANGE_FILTERS.items():
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+            order = np.argsort(values, kind="stable")  # NaN sorts last
+            self.sorted[field] = (values[order], order, int(np.count_nonzero(~np.isnan(values))))
+        self.bitmaps = {}
+
+    def text_bitmap(self, field, term):
+        key = (field, term)
+        if key not in self.bitmaps:
+            hits = np.flatnonzero(self.uniques[field].str.contains(term, regex=False).fillna(False).to_numpy())
+            self.bitmaps[key] = np.isin(self.codes[field], hits)
+        return self.bitmaps[key]
+
+    def range_bitmap(self, field, low, high):
+        key = (field, low, high)
+        if key not in self.bitmaps:
+            values, order, valid = self.sorted[field]
+            start = np.searchsorted(values[:valid], low, side="left") if low is not None else 0
+            end = np.searchsorted(values[:valid], high, side="right") if high is not None else valid
+            bitmap = np.zeros(self.size, dtype=bool)
+            bitmap[order[start:end]] = True
+            self.bitmaps[key] = bitmap
+        return self.bitmaps[key]
+
+    def match(self, subscription):
+        """Positions of the rows that satisfy every filter of a subscription."""
+        bitmap = np.ones(self.size, dtype=bool)
+        for field in TEXT_FILTERS:
+            terms = normalize_terms(field, subscription.get(field) or [])
+            if terms:
+                bitmap &= np.logical_or.reduce([self.text_bitmap(field, term) for term in terms])
+        for field, (low, high, _) in RANGE_FILTERS.items():
+            if subscription.get(low) is not None or subscription.get(high) is not None:
+                bitmap &= self.range_bitmap(field, subscription.get(low), subscription.get(high))
+        return np.flatnonzero(bitmap)
+
+def match_subscriptions(df, subscriptions):
+    """Map each subscriber's email to the positions of the rows matching their filters."""
+    index = AuctionIndex(df)
+    matches = {subscription["email"]: index.match(subscription) for subscription in subscriptions}
+    logger.info(f"Matched {len(subscriptions)} subscriptions against {len(df)} auctions "
+                f"({len(index.bitmaps)} distinct filter bitmaps)")
+    return matches
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Manage alert subscriptions.")
+    parser.add_argument("--list", action="store_true", help="Show every subscription")
+    parser.add_argument("--add", metavar="EMAIL", help="Add or replace the subscription of EMAIL")
+    parser.add_argument("--remove", metavar="EMAIL", help="Delete the subscription of EMAIL")
+    parser.add_argument("--match", action="store_true", help="Count matches per subscriber on the latest stored day")
+    for field in TEXT_FILTERS:
+        parser.add_argument(f"--{field}", nargs="+", help=f"With --add, {field} to match")
+    for low, high, _ in RANGE_FILTERS.values():
+        for bound in (low, high):
+            parser.add_argument(f"--{bound.replace('_', '-')}", type=int, help=f"With --add, {bound}")
+    args = parser.parse_args()
+    if SUBSCRIPTIONS_JSON and (args.add or args.remove):
+        parser.error("SUBSCRIPTIONS_JSON is set; edit the secret instead of the file")
+    subscriptions = load_subscriptions() or []
+    if args.add or args.remove:
+        email = args.add or args.remove
+        subscriptions = [s for s in subscriptions if s["email"].strip().lower() != email.strip().lower()]
+        if args.add:
+            fields = {field: getattr(args, field) for field in FIELDS[1:] if getattr(args, field) is not None}
+            subscriptions.append(validate({"email": email, **fields}))
+        save_subscriptions(subscriptions)
+        logger.info(f"{'Saved' if args.add else 'Removed'} subscription of {email} in {SUBSCRIPTIONS_FILE}")
+    if args.list:
+        for subscription in subscriptions:
+            print(f"{subscription['email']}: {describe(subscription)}")
+    if args.match and subscriptions:
+        from email_alert import load_upcoming
+        df = load_upcoming(max(subscription["max_days"] for subscription in subscriptions), 0)
+        if df is not None:
+            for email, rows in match_subscriptions(df.reset_index(drop=True), subscriptions).items():
+                print(f"{email}: {len(rows)} auctions")
+    if not (args.list or args.add or args.remove or args.match):
+        parser.print_help()
@@ -1,173 +1,187 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-import pandas as pd
 from selenium.common.exceptions import TimeoutException
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
 import os
-import shutil
-import psutil
-import tempfile
 import logging
-import subprocess
+from browser_pool import USER_AGENT
+from scraper_base import Source, run_cli
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Output directory
-DOWNLOAD_DIR = "auction_exports"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-
-def setup_chrome_options(user_data_dir):
-    """Set up Chrome options for headless browsing."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Enable headless mode
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36")
-    chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-    chrome_options.add_experimental_option('prefs', {
-        "download.default_directory": os.path.abspath(DOWNLOAD_DIR),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True,
-        "safebrowsing.enabled": True
-    })
-    return chrome_options
-
-def cleanup_chrome_processes():
-    """Kill any lingering Chrome processes."""
-    chrome_processes = []
-    for proc in psutil.process_iter(['name', 'pid']):
-        if proc.info['name'] in ['chrome', 'chromium', 'chromedriver']:
-            chrome_processes.append((proc.info['pid'], proc.info['name']))
-            try:
-                proc.kill()
-                logger.info(f"Killed lingering process: {proc.info['name']} (PID: {proc.info['pid']})")
-            except psutil.NoSuchProcess:
-                logger.info(f"Process {proc.info['name']} (PID: {proc.info['pid']}) already terminated.")
-    return chrome_processes
-
-# Clean up any lingering Chrome processes before starting
-logger.info("Cleaning up Chrome processes before starting...")
-existing_processes = cleanup_chrome_processes()
-if existing_processes:
-    logger.info(f"Found and killed {len(existing_processes)} Chrome-related processes: {existing_processes}")
-else:
-    logger.info("No Chrome-related processes found running.")
-
-# Verify ChromeDriver version
-try:
-    chromedriver_version = subprocess.check_output(["chromedriver", "--version"]).decode().strip()
-    logger.info(f"ChromeDriver version: {chromedriver_version}")
-except Exception as e:
-    logger.error(f"Failed to check ChromeDriver version: {e}")
-
-# Create a temporary user data directory
-user_data_dir = tempfile.mkdtemp(prefix="chrome_user_data_web3_")
-logger.info(f"Created temporary user data directory: {user_data_dir}")
-
-# Verify the directory is empty
-if os.path.exists(user_data_dir):
-    dir_contents = os.listdir(user_data_dir)
-    if dir_contents:
-        logger.warning(f"User data directory {user_data_dir} is not empty: {dir_contents}")
-    else:
-        logger.info(f"User data directory {user_data_dir} is empty as expected.")
-else:
-    logger.error(f"User data directory {user_data_dir} was not created!")
-    exit(1)
-
-# Initialize the WebDriver
-chrome_options = setup_chrome_options(user_data_dir)
-driver = None
-try:
-    logger.info("Starting Chrome WebDriver...")
-    driver = webdriver.Chrome(options=chrome_options)
-    logger.info("Chrome WebDriver started successfully.")
-    
-    wait = WebDriverWait(driver, 15)
-    driver.get("https://eauction.gov.in/eAuction/app?page=FrontEndEauctionByDate&service=page")
-    time.sleep(5)
-
+# Overridable so the scraper can be pointed at a local fixture site
+START_URL = os.getenv("WEB3_URL", "https://eauction.gov.in/eAuction/app?page=FrontEndEauctionByDate&service=page")
+
+# Number of auction detail popups fetched in parallel
+DETAIL_CONCURRENCY = int(os.getenv("WEB3_DETAIL_CONCURRENCY", "8"))
+DETAIL_TIMEOUT = 30
+
+FIELDNAMES = [
+    "Organisation Chain", "Auction ID", "EMD Amount", "Starting Price",
+    "Submission Start Date", "Submission End Date", "Auction Start Date", "Product Category"
+]
+
+def parse_detail(html):
+    """Extract the auction fields from a detail popup page."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    def get_value(label):
+        td = soup.find('td', string=lambda s: s and label in s)
+        if td and td.find_next_sibling('td'):
+            return td.find_next_sibling('td').get_text(strip=True)
+        return ""
+
+    data = {}
+    data['Organisation Chain'] = get_value("Organisation Chain")
+    data['Auction ID'] = get_value("Auction ID")
+    data['EMD Amount'] = get_value("EMD Amount in ₹")
+    data['Starting Price'] = get_value("Starting Price in ₹")
+    data['Submission Start Date'] = get_value("Submission Start Date")
+    data['Submission End Date'] = get_value("Submission End Date")
+    data['Auction Start Date'] = get_value("Auction Start Date")
+    data['Product Category'] = get_value("Product Category")
+    return data
+
+def build_http_session(driver):
+    """Create a pooled HTTP session that carries the browser's cookies."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=DETAIL_CONCURRENCY, pool_maxsize=DETAIL_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Referer": driver.current_url})
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return session
+
+def fetch_detail(session, url, paced):
+    """Fetch a detail popup over HTTP and return its HTML."""
+    with paced(url):
+        response = session.get(url, timeout=DETAIL_TIMEOUT)
+        response.raise_for_status()
+    return response.text
+
+def fetch_detail_in_tab(driver, url, paced):
+    """Fallback: open a detail popup in a browser tab and return its HTML."""
+    driver.execute_script("window.open(arguments[0]);", url)
+    driver.switch_to.window(driver.window_handles[-1])
     try:
-        closing_tab = driver.find_element(By.ID, "closingWeekTab")
-        closing_tab.click()
-        time.sleep(5)
-        logger.info("Clicked 'Closing within 7 days' tab.")
-    except Exception as e:
-        logger.error("Could not click 'Closing within 7 days' tab: %s", e)
-
-    results = []
-    page_num = 1
-
-    while True:
-        logger.info(f"Scraping page {page_num}...")
-        search_links = driver.find_elements(By.XPATH, "//a[starts-with(@id, 'view_')]")
-        popup_urls = [link.get_attribute("href") for link in search_links]
-
-        for url in popup_urls:
-            driver.execute_script("window.open(arguments[0]);", url)
-            driver.switch_to.window(driver.window_handles[-1])
-            time.sleep(5)
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            data = {}
-
-            def get_value(label):
-                td = soup.find('td', string=lambda s: s and label in s)
-                if td and td.find_next_sibling('td'):
-                    return td.find_next_sibling('td').get_text(strip=True)
-                return ""
-
-            data['Organisation Chain'] = get_value("Organisation Chain")
-            data['Auction ID'] = get_value("Auction ID")
-            data['EMD Amount'] = get_value("EMD Amount in ₹")
-            data['Starting Price'] = get_value("Starting Price in ₹")
-            data['Submission Start Date'] = get_value("Submission Start Date")
-            data['Submission End Date'] = get_value("Submission End Date")
-            data['Auction Start Date'] = get_value("Auction Start Date")
-            data['Product Category'] = get_value("Product Category") 
-
-            results.append(data)
-            driver.close()
-            driver.switch_to.window(driver.window_handles[0])
+        with paced(url):
+            WebDriverWait(driver, DETAIL_TIMEOUT).until(lambda d: d.execute_script("return document.readyState") == "complete")
+        return driver.page_source
+    finally:
+        driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+
+def fetch_details(driver, popup_urls, paced):
+    """Fetch all detail popups of a listing page concurrently, preserving page order.
+
+    Requests go through `paced`, so the host's rate limiter sets the effective rate.
+    """
+    rows = [None] * len(popup_urls)
+    failed = []
+    session = build_http_session(driver)
+    try:
+        with ThreadPoolExecutor(max_workers=DETAIL_CONCURRENCY) as executor:
+            futures = {executor.submit(fetch_detail, session, url, paced): i for i, url in enumerate(popup_urls)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    data = parse_detail(future.result())
+                except Exception as e:
+                    logger.warning("HTTP fetch failed for %s: %s", popup_urls[i], e)
+                    failed.append(i)
+                    continue
+                if not data['Auction ID']:
+                    # The popup did not render over plain HTTP (e.g. session mismatch)
+                    failed.append(i)
+                    continue
+                rows[i] = data
+    finally:
+        session.close()
+
+    if failed:
+        logger.info("Falling back to browser tabs for %d of %d popups", len(failed), len(popup_urls))
+    for i in sorted(failed):
+        try:
+            rows[i] = parse_detail(fetch_detail_in_tab(driver, popup_urls[i], paced))
+        except Exception as e:
+            logger.error("Failed to fetch popup %s: %s", popup_urls[i], e)
+    return [row for row in rows if row is not None]
+
+class Web3Source(Source):
+    """Auctions closing within 7 days on eauction.gov.in."""
+
+    name = "web3"
+    output_prefix = "web3_auctions"
+    fieldnames = FIELDNAMES
+    # Pagination uses real clicks, so keep stylesheets for a faithful layout
+    allowed_resources = ("*.css",)
 
+    def row_id(self, row):
+        return row["Auction ID"]
+
+    def click_next(self, driver, wait):
+        """Click the forward link; False once there is no further page."""
         try:
             next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="linkFwd"]')))
             driver.execute_script("arguments[0].scrollIntoView(true);", next_btn)
-            time.sleep(1)
-            next_btn.click()
-            time.sleep(3)
-            page_num += 1
+            with self.paced(START_URL):
+                next_btn.click()
+                wait.until(EC.staleness_of(next_btn))
+            return True
         except TimeoutException:
             logger.info("No more pages or next button not clickable (timeout).")
-            break
+            return False
         except Exception as e:
+            self.check_cancelled()
             logger.info("No more pages or next button not found: %s", e)
-            break
-
-finally:
-    if driver:
-        driver.quit()
-        logger.info("Browser closed")
-    # Additional cleanup
-    cleanup_chrome_processes()
-    if user_data_dir and os.path.exists(user_data_dir):
-        try:
-            shutil.rmtree(user_data_dir)
-            logger.info("Cleaned up user data directory: %s", user_data_dir)
-        except Exception as e:
-            logger.warning("Failed to clean up user data directory: %s", e)
+            return False
 
-df = pd.DataFrame(results)
-today_str = datetime.now().strftime('%Y%m%d')
-output_file = os.path.join(DOWNLOAD_DIR, f"web3_auctions_{today_str}.csv")
-df.to_csv(output_file, index=False)
-logger.info(f"Saved to {output_file}")
+    def scrape_into(self, sink):
+        with self.browser() as driver:
+            wait = WebDriverWait(driver, 15)
+
+            with self.paced(START_URL):
+                driver.get(START_URL)
+
+            try:
+                closing_tab = wait.until(EC.element_to_be_clickable((By.ID, "closingWeekTab")))
+                with self.paced(START_URL):
+                    closing_tab.click()
+                    wait.until(EC.staleness_of(closing_tab))
+                logger.info("Clicked 'Closing within 7 days' tab.")
+            except Exception as e:
+                logger.error("Could not click 'Closing within 7 days' tab: %s", e)
+
+            if sink.last_page:
+                logger.info(f"Resuming: skipping {sink.last_page} pages already saved")
+                for _ in range(sink.last_page):
+                    self.check_cancelled()
+                    if not self.click_next(driver, wait):
+                        return
+            page_num = sink.last_page + 1
+
+            while True:
+                self.check_cancelled()
+                logger.info(f"Scraping page {page_num}...")
+                search_links = driver.find_elements(By.XPATH, "//a[starts-with(@id, 'view_')]")
+                popup_urls = [link.get_attribute("href") for link in search_links]
+
+                page_start = time.time()
+                page_results = fetch_details(driver, popup_urls, self.paced)
+                sink.write_page(page_results, page=page_num)
+                self.pool.page_loaded(driver)
+                logger.info(f"Fetched {len(page_results)} of {len(popup_urls)} popups on page {page_num} in {time.time() - page_start:.1f}s")
+
+                if not self.click_next(driver, wait):
+                    break
+                page_num += 1
+
+if __name__ == "__main__":
+    run_cli(Web3Source)